@@ -0,0 +1,256 @@
+"""Headless benchmarks of the data loaders, ledger aggregations and chart builds
+
+Synthesizes QALY tables and NFT ledgers of each requested size with
+realistic cardinalities, times every stage and writes the results as JSON.
+Pass --compare with an earlier results file to flag stages that got slower.
+
+    python benchmark.py --sizes 10k 100k 1M --output benchmark_results.json
+    python benchmark.py --sizes 10k 100k --compare benchmark_results.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import data_loader
+from cube import AggregateCube
+from ledger import LEDGER_COLUMNS, LedgerFilter, display_ledger, format_nft_id, page_rows, sort_rows
+from transfers import TRANSFER_LOG, TransferEngine
+
+DEFAULT_SIZES = ["10k", "100k", "1M"]
+
+# Ledger rows per program; the QALY table has one row per program
+NFTS_PER_PROGRAM = 100
+DISEASES = 12
+INTERVENTIONS_PER_DISEASE = 4
+OWNERS = 40
+
+# Share of ledger rows moved by the synthetic transfer log, and NFTs per logged transaction
+TRANSFER_SHARE = 0.01
+TRANSFER_BATCH = 100
+
+# A stage is reported as a regression when it is this much slower than the baseline
+REGRESSION_RATIO = 1.25
+# ...and at least this many seconds slower, so timer noise on tiny stages is ignored
+REGRESSION_MIN_SECONDS = 0.005
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def synthesize(rows, seed=0):
+    """QALY table and ledger CSV text for a ledger of the given number of rows"""
+    rng = np.random.default_rng(seed)
+    programs = max(10, rows // NFTS_PER_PROGRAM)
+    disease = rng.integers(0, DISEASES, programs)
+    intervention = disease * INTERVENTIONS_PER_DISEASE + rng.integers(0, INTERVENTIONS_PER_DISEASE, programs)
+    patients = rng.integers(100, 5000, programs)
+    avg_gain = rng.uniform(0.5, 4.0, programs).round(2)
+    qaly_df = pd.DataFrame({
+        'Program ID': [f"P{i}" for i in range(programs)],
+        'Program Name': [f"Program {i}" for i in range(programs)],
+        'Disease': [f"Disease {d}" for d in disease],
+        'Intervention': [f"Intervention {i}" for i in intervention],
+        'Patient': patients,
+        'Survival Pop': (patients * rng.uniform(0.7, 1.0, programs)).round(1),
+        'Avg QALY Gain': avg_gain,
+        'Tot QALY Gain': (patients * avg_gain).round(0),
+        'Cost': rng.integers(20, 100_000, programs),
+    })
+
+    program = rng.integers(0, programs, rows)
+    mint_date = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 2 * 365 * 86400, rows), unit='s')
+    nft_df = pd.DataFrame({
+        'nft_id': "NFT-" + pd.Series(np.arange(1, rows + 1)).astype(str).str.zfill(6),
+        'program_id': qaly_df['Program ID'].to_numpy()[program],
+        'disease': qaly_df['Disease'].to_numpy()[program],
+        'intervention': qaly_df['Intervention'].to_numpy()[program],
+        'owner_id': [f"Owner {o}" for o in rng.integers(0, OWNERS, rows)],
+        'status': np.where(rng.random(rows) < 0.8, 'active', 'transferred'),
+        'mint_date': mint_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        'transfer_count': rng.poisson(1.5, rows),
+        'qaly_value': (1 / qaly_df['Tot QALY Gain'].to_numpy()[program]).round(4),
+    }, columns=LEDGER_COLUMNS)
+    return qaly_df.to_csv(index=False).encode(), nft_df.to_csv(index=False).encode()
+
+
+def synthesize_transfer_log(nft_df, path, seed=0):
+    """Write an audit log of batch transfers covering TRANSFER_SHARE of the ledger"""
+    rng = np.random.default_rng(seed)
+    moved = rng.choice(nft_df['nft_id'].to_numpy(), int(len(nft_df) * TRANSFER_SHARE), replace=False)
+    with open(path, "w", encoding='utf-8') as f:
+        for start in range(0, len(moved), TRANSFER_BATCH):
+            nft_ids = moved[start:start + TRANSFER_BATCH]
+            f.write(json.dumps({
+                'transaction_id': f"BATCH-{start:08d}",
+                'nft_ids': [format_nft_id(nft_id) for nft_id in nft_ids.tolist()],
+                'from': "",
+                'to': f"Owner {rng.integers(0, OWNERS)}",
+                'qaly_value': 0.0,
+                'timestamp': datetime(2024, 1, 1).isoformat(),
+                'reason': "benchmark",
+            }) + "\n")
+
+
+def timed(fn, repeat):
+    """Run fn repeat times; return its last result and the wall times in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def overview_figures(qaly_df):
+    disease_summary = qaly_df.groupby('Disease')[['Tot QALY Gain', 'Patient']].sum().reset_index()
+    pie = px.pie(disease_summary, values='Tot QALY Gain', names='Disease', color='Disease')
+    scatter = px.scatter(qaly_df, x='Avg QALY Gain', y='Cost per QALY', size='Tot QALY Gain',
+                         color='Disease', hover_name='Program Name')
+    return [pie, scatter]
+
+
+def nft_management_figures(cube):
+    ownership = cube.slice(['owner_id'])
+    return [
+        px.bar(cube.slice(['disease']), x='disease', y='count', color='disease'),
+        px.pie(cube.slice(['status']), values='count', names='status'),
+        px.bar(ownership, x='owner_id', y='count', color='qaly_value'),
+        px.scatter(cube.slice(['disease', 'intervention']), x='disease', y='intervention',
+                   size='count', color='transfer_count'),
+    ]
+
+
+def nft_management_figures_input(cube):
+    """The cube slices the NFT Management page draws from"""
+    return [cube.totals()] + [
+        cube.slice(dimensions)
+        for dimensions in (['disease'], ['status'], ['owner_id'], ['mint_month'], ['disease', 'intervention'])
+    ]
+
+
+def benchmark_size(rows, repeat, directory):
+    """Timings of every stage for one ledger size, as a list of result dicts"""
+    qaly_csv, ledger_csv = synthesize(rows)
+    qaly_path = os.path.join(directory, "QALY_data.csv")
+    ledger_path = os.path.join(directory, "nft_ledger.csv")
+    for path, payload in [(qaly_path, qaly_csv), (ledger_path, ledger_csv)]:
+        with open(path, "wb") as f:
+            f.write(payload)
+    snapshot_path = os.path.join(directory, "nft_ledger.arrow")
+
+    stages = {}
+    (raw, digest), stages['load'] = timed(lambda: data_loader._read(ledger_path), repeat)
+    qaly_df, stages['parse_qaly'] = timed(lambda: data_loader.load_qaly_data(io.BytesIO(qaly_csv)), repeat)
+    nft_df, stages['parse_ledger'] = timed(lambda: data_loader.generate_nft_ledger(io.BytesIO(raw)), repeat)
+    if data_loader.pa is not None:
+        _, stages['snapshot_write'] = timed(lambda: data_loader.write_snapshot(snapshot_path, nft_df, digest), repeat)
+        # The app's cold load from a snapshot: memory-map, then re-attach the shared categories
+        snapshot_dir, data_loader.SNAPSHOT_DIR = data_loader.SNAPSHOT_DIR, directory
+        try:
+            _, stages['snapshot_load'] = timed(
+                lambda: data_loader._parse('nft_df', "nft_ledger.csv", "", raw, digest), repeat
+            )
+        finally:
+            data_loader.SNAPSHOT_DIR = snapshot_dir
+
+    # Every cold load also builds the transfer indexes and replays the audit log
+    prefix = os.path.join(directory, "")
+    synthesize_transfer_log(nft_df, prefix + TRANSFER_LOG)
+    ledgers = iter([nft_df.copy() for _ in range(repeat)])
+    _, stages['engine_build'] = timed(lambda: TransferEngine(prefix, next(ledgers)), repeat)
+
+    cube, stages['aggregate'] = timed(lambda: AggregateCube(nft_df), repeat)
+    _, stages['slice'] = timed(lambda: nft_management_figures_input(cube), repeat)
+    ledger_filter, stages['filter_index'] = timed(lambda: LedgerFilter(nft_df), repeat)
+    owner = nft_df['owner_id'].iat[0]
+    selected, stages['filter_select'] = timed(lambda: ledger_filter.select(owner_id=owner, status='active'), repeat)
+    _, stages['table_page'] = timed(
+        lambda: display_ledger(nft_df, rows=page_rows(sort_rows(nft_df, selected, 'qaly_value', False), 1, 50)),
+        repeat,
+    )
+
+    figures, stages['figure_build'] = timed(
+        lambda: overview_figures(qaly_df) + nft_management_figures(cube), repeat
+    )
+    _, stages['serialize'] = timed(lambda: [fig.to_json() for fig in figures], repeat)
+
+    return [
+        {
+            'rows': rows,
+            'programs': len(qaly_df),
+            'stage': stage,
+            'best': min(times),
+            'median': statistics.median(times),
+            'repeat': len(times),
+        }
+        for stage, times in stages.items()
+    ]
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO, min_seconds=REGRESSION_MIN_SECONDS):
+    """(rows, stage, baseline seconds, current seconds) of every stage slower than ratio x baseline"""
+    previous = {(entry['rows'], entry['stage']): entry['best'] for entry in baseline['results']}
+    regressions = []
+    for entry in results['results']:
+        before = previous.get((entry['rows'], entry['stage']))
+        if before and entry['best'] > before * ratio and entry['best'] - before > min_seconds:
+            regressions.append((entry['rows'], entry['stage'], before, entry['best']))
+    return regressions
+
+
+def run(sizes, repeat=3):
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            results.extend(benchmark_size(rows, repeat, directory))
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'pyarrow': data_loader.pa is not None,
+        },
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the QALY dashboard data pipeline")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="ledger rows, e.g. 10k 100k 1M 10M")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to check for regressions")
+    args = parser.parse_args()
+
+    results = run([parse_size(size) for size in args.sizes], args.repeat)
+    for entry in results['results']:
+        print(f"{entry['rows']:>10,} rows  {entry['stage']:<15} {entry['best'] * 1000:10.1f} ms")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding='utf-8') as f:
+            regressions = compare(results, json.load(f))
+        for rows, stage, before, after in regressions:
+            print(f"REGRESSION {rows:,} rows {stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+
+    with open(args.output, "w", encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    sys.exit(1 if regressions else 0)
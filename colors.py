@@ -0,0 +1,83 @@
+import json
+import os
+
+from locks import file_lock
+from resources import load_resource
+
+# Per dataset prefix: every Disease and Intervention label and its chart color, in assignment order
+COLOR_FILE = "colors.json"
+
+# Professional, varied palette (manually curated, avoiding pink/purple)
+PALETTE = [
+    '#1f77b4',  # muted blue
+    '#2ca02c',  # green
+    '#ff7f0e',  # orange
+    '#8c564b',  # brown
+    '#7f7f7f',  # gray
+    '#17becf',  # teal/cyan
+    '#bcbd22',  # olive
+    '#aec7e8',  # light blue
+    '#98df8a',  # light green
+    '#ffbb78',  # light orange
+    '#9edae5',  # light cyan
+    '#d62728',  # red (use sparingly but accepted in professional charts)
+    '#c49c94',  # beige
+]
+
+
+def chart_labels(qaly_df):
+    """Intervention and Disease labels of a QALY table, in sorted order"""
+    labels = set()
+    for column in ('Intervention', 'Disease'):
+        if column in qaly_df.columns:
+            labels.update(qaly_df[column].dropna().astype(str))
+    return sorted(labels)
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _assign(colors, labels):
+    """Give labels missing from colors the next palette colors in place; return whether any were added"""
+    missing = [label for label in labels if label not in colors]
+    for label in missing:
+        colors[label] = PALETTE[len(colors) % len(PALETTE)]
+    return bool(missing)
+
+
+def register(dataset, labels):
+    """Give every label not yet in the dataset's registry the next palette color; return the registry
+
+    Existing labels keep their color, so adding programs never shifts the charts."""
+    path = dataset + COLOR_FILE
+    with file_lock(path):
+        colors = _read(path)
+        if _assign(colors, labels):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(colors, f, indent=2)
+            os.replace(tmp_path, path)
+    return colors
+
+
+def color_map(dataset, qaly_df):
+    """Label -> color for a dataset's charts, registering labels seen for the first time"""
+    labels = chart_labels(qaly_df)
+    path = dataset + COLOR_FILE
+    try:
+        colors = load_resource(path, json.loads)
+    except OSError:
+        colors = {}
+    if any(label not in colors for label in labels):
+        try:
+            colors = register(dataset, labels)
+        except OSError:
+            # A read-only checkout still gets colors, they are just not kept for the next load
+            colors = dict(colors)
+            _assign(colors, labels)
+    # Copy so callers never mutate the cached registry
+    return dict(colors)
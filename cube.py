@@ -0,0 +1,62 @@
+import pandas as pd
+
+# Dimensions of the NFT aggregate cube; every NFT Management metric is a slice of it
+CUBE_DIMENSIONS = ['disease', 'intervention', 'owner_id', 'status', 'mint_month']
+
+
+def _cells(rows, transfer_counts=None):
+    """Aggregate ledger rows into cube cells: NFT count, QALY value and transfers"""
+    frame = pd.DataFrame({
+        'disease': rows['disease'].to_numpy(),
+        'intervention': rows['intervention'].to_numpy(),
+        'owner_id': rows['owner_id'].to_numpy(),
+        'status': rows['status'].to_numpy(),
+        'mint_month': rows['mint_date'].dt.to_period('M').to_numpy(),
+        'count': 1,
+        'qaly_value': rows['qaly_value'].to_numpy(dtype='float64'),
+        'transfer_count': rows['transfer_count'].to_numpy(dtype='int64')
+            if transfer_counts is None else transfer_counts,
+    })
+    return frame.groupby(CUBE_DIMENSIONS, dropna=False).sum()
+
+
+class AggregateCube:
+    """NFT counts, QALY value and transfers by disease x intervention x owner x status x mint month
+
+    Built once per ledger version and kept current by applying transfer
+    deltas, so slicing it costs the same whatever the ledger size."""
+
+    def __init__(self, nft_df, cells=None):
+        self.nft_df = nft_df
+        # cells may come precomputed, e.g. from a background aggregation job
+        self.cells = _cells(nft_df) if cells is None else cells
+
+    def apply_transfer(self, rows, previous_owners):
+        """Move already-transferred ledger rows from their previous owners' cells"""
+        moved = self.nft_df.iloc[rows]
+        before = moved.assign(owner_id=previous_owners)
+        removed = _cells(before, moved['transfer_count'].to_numpy(dtype='int64') - 1)
+        self._merge(_cells(moved), removed)
+
+    def _merge(self, added, removed=None):
+        cells = self.cells.add(added, fill_value=0)
+        if removed is not None:
+            cells = cells.sub(removed, fill_value=0)
+        # Swap in one assignment so concurrent readers see either version whole
+        self.cells = cells[cells['count'] > 0].astype({'count': 'int64', 'transfer_count': 'int64'})
+
+    def slice(self, dimensions):
+        """Cube rolled up to the given dimensions, as a flat DataFrame"""
+        cells = self.cells
+        return cells.groupby(level=dimensions, dropna=False).sum().reset_index()
+
+    def totals(self):
+        cells = self.cells
+        statuses = cells.index.get_level_values('status')
+        owners = cells.index.get_level_values('owner_id')
+        return {
+            'nfts': int(cells['count'].sum()),
+            'active': int(cells.loc[statuses == 'active', 'count'].sum()),
+            'owners': owners.nunique(),
+            'transfers': int(cells['transfer_count'].sum()),
+        }
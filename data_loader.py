@@ -0,0 +1,512 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+import colors
+import jobs
+from cube import AggregateCube
+from dates import parse_dates
+from history import TransferHistory
+from ledger import MUTABLE_COLUMNS, LedgerFilter, compact_ledger, memory_footprint
+from transfers import TransferEngine
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # snapshots are optional, fall back to parsing the CSVs
+    pa = None
+
+# Files making up one dataset; the dataset prefix ("", "RRT_", "VHW_") is prepended
+TABLE_FILES = {
+    'qaly_df': "QALY_data.csv",
+    'nft_df': "nft_ledger.csv",
+    'time_series_df': "time_series_data.csv",
+}
+
+# Tables parsed on first use rather than when the dataset loads; pages that only
+# show programs never pay for the ledger parse, transfer indexes or log replay
+LAZY_TABLES = ('nft_df',)
+
+# Number of datasets kept in memory before the least recently used unreferenced one is dropped
+MAX_CACHED_DATASETS = 3
+
+# Columnar snapshots of the parsed tables, rebuilt whenever the source CSV changes
+SNAPSHOT_DIR = os.environ.get("QALY_SNAPSHOT_DIR", ".snapshots")
+
+# Bumped whenever the in-memory table layout changes so old snapshots are rebuilt
+SNAPSHOT_VERSION = "6"
+
+# Seconds between stat() checks of a cached dataset; explicit invalidate() bypasses this
+STAT_INTERVAL = 2.0
+
+_cache = OrderedDict()
+_lock = threading.RLock()
+# One lock per dataset prefix, held while that dataset is parsed
+_load_locks = {}
+
+
+class Dataset:
+    """Tables loaded for one dataset prefix, shared read-only by every session
+
+    The ledger and its transfer engine are loaded on first access."""
+
+    def __init__(self, prefix, stats, digests, tables, pending=None, engine=None):
+        self.prefix = prefix
+        self.stats = stats
+        self.digests = digests
+        # Parsed tables; LAZY_TABLES not parsed yet are in _pending as
+        # (raw bytes or None when an up-to-date snapshot exists, row count)
+        self.tables = tables
+        self._pending = pending or {}
+        self._engine = engine
+        self._load_lock = threading.RLock()
+        # Number of live DatasetHandles; referenced datasets are never evicted
+        self.refs = 0
+        self._cube = None
+        self._ledger_filter = None
+        self._history = None
+        self.checked_at = time.monotonic()
+        self.version = prefix + hashlib.blake2b(
+            "".join(digests[name] for name in TABLE_FILES).encode(), digest_size=8
+        ).hexdigest()
+
+    @property
+    def qaly_df(self):
+        return self.tables['qaly_df']
+
+    @property
+    def nft_df(self):
+        return self.table('nft_df')
+
+    @property
+    def time_series_df(self):
+        return self.tables['time_series_df']
+
+    @property
+    def color_map(self):
+        return self.tables['color_map']
+
+    def table(self, name):
+        """A table of this dataset, parsing it first if it is one of the LAZY_TABLES"""
+        table = self.tables.get(name)
+        if table is not None:
+            return table
+        with self._load_lock:
+            if name not in self.tables:
+                raw, _ = self._pending[name]
+                if raw is None:
+                    # The snapshot was current at load time; fall back to the file if it has gone since
+                    raw, _ = _read(self.prefix + TABLE_FILES[name])
+                self.tables[name] = _parse(name, TABLE_FILES[name], self.prefix, raw, self.digests[name])
+                del self._pending[name]
+            return self.tables[name]
+
+    @property
+    def ledger_rows(self):
+        """Number of ledger rows, counted without parsing the ledger when it is not loaded yet"""
+        with self._load_lock:
+            if 'nft_df' in self._pending:
+                return self._pending['nft_df'][1]
+        return len(self.nft_df)
+
+    @property
+    def engine(self):
+        """Transfer engine of the ledger; the first access parses the ledger and replays the audit log"""
+        if self._engine is None:
+            with self._load_lock:
+                if self._engine is None:
+                    self._engine = TransferEngine(self.prefix, self.nft_df)
+        return self._engine
+
+    @property
+    def cube(self):
+        """Aggregate cube of the ledger, built on first use and kept current by the transfer engine"""
+        with self.engine._lock:
+            if self._cube is None:
+                self._cube = AggregateCube(self.nft_df)
+                self.engine.listeners.append(self._cube.apply_transfer)
+            return self._cube
+
+    def cube_future(self):
+        """Future of the aggregate cube; large ledgers are aggregated in a worker process
+
+        Sessions asking for the same ledger version share one job."""
+        with self.engine._lock:
+            if self._cube is not None or len(self.nft_df) < jobs.BACKGROUND_MIN_ROWS:
+                return jobs.completed(self.cube)
+        result = Future()
+        job = jobs.submit((self.version, 'cube'), build_cube_cells, self.prefix)
+        job.add_done_callback(lambda done: self._attach_cube(done, result))
+        return result
+
+    def _attach_cube(self, job, result):
+        try:
+            with self.engine._lock:
+                if self._cube is None and job.exception() is None:
+                    version, log_offset, cells = job.result()
+                    # The worker's cells only hold if it saw the same files and transfers as us
+                    if version == self.version and log_offset == self.engine.log_offset:
+                        self._cube = AggregateCube(self.nft_df, cells)
+                        self.engine.listeners.append(self._cube.apply_transfer)
+                result.set_result(self.cube)
+        except Exception as e:
+            result.set_exception(e)
+
+    @property
+    def ledger_filter(self):
+        """Positional filter indexes over the ledger, kept current by the transfer engine"""
+        with self.engine._lock:
+            if self._ledger_filter is None:
+                self._ledger_filter = LedgerFilter(self.nft_df)
+                self.engine.listeners.append(self._ledger_filter.apply_transfer)
+            return self._ledger_filter
+
+    @property
+    def history(self):
+        """Daily transfer rollups from the audit log, kept current by the transfer engine"""
+        with self.engine._lock:
+            if self._history is None:
+                self._history = TransferHistory(
+                    self.engine.log_path, self.engine.log_offset,
+                    self.nft_df['transfer_count'].to_numpy().sum(dtype='int64'),
+                )
+                self.engine.record_listeners.append(self._history.add)
+            return self._history
+
+    def validation_report(self):
+        """Parse problems found when the tables were loaded, one entry per checked column
+
+        A lazy table not parsed yet has nothing to report."""
+        return [
+            dict(report, table=TABLE_FILES[name])
+            for name in TABLE_FILES if name in self.tables
+            for report in self.tables[name].attrs.get('validation', [])
+        ]
+
+    def memory_usage(self):
+        """Bytes held by each loaded table of this dataset"""
+        return {name: memory_footprint(self.tables[name]) for name in TABLE_FILES if name in self.tables}
+
+
+# Data loading and processing
+def load_qaly_data(source):
+    df = pd.read_csv(source)
+    df['Cost per QALY'] = df['Cost'] / df['Avg QALY Gain']
+    return df
+
+def generate_nft_ledger(source):
+    df = pd.read_csv(source)
+    df['mint_date'], report = parse_dates(df['mint_date'], 'mint_date')
+    df = compact_ledger(df)
+    df.attrs['validation'] = [report]
+    return df
+
+def generate_time_series_data(source):
+    df = pd.read_csv(source)
+    df['Date'], report = parse_dates(df['Date'], 'Date')
+    df.attrs['validation'] = [report]
+    return df
+
+
+_PARSERS = {
+    'qaly_df': load_qaly_data,
+    'nft_df': generate_nft_ledger,
+    'time_series_df': generate_time_series_data,
+}
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return raw, hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _snapshot_path(prefix, filename):
+    return os.path.join(SNAPSHOT_DIR, prefix + os.path.splitext(filename)[0] + ".arrow")
+
+
+def _snapshot_key(digest):
+    return f"{SNAPSHOT_VERSION}:{digest}".encode()
+
+
+def read_snapshot(path, digest):
+    """Memory-map a snapshot and return it as a DataFrame, or None if missing or out of date
+
+    Columns are zero-copy, read-only views of the mapped file, so processes
+    reading the same snapshot share its pages through the OS page cache."""
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            metadata = reader.schema.metadata or {}
+            if metadata.get(b'source_digest') != _snapshot_key(digest):
+                return None
+            df = reader.read_all().to_pandas(split_blocks=True)
+            df.attrs['validation'] = json.loads(metadata.get(b'validation', b'[]'))
+            return df
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def snapshot_rows(path, digest):
+    """Row count of an up-to-date snapshot, read from its batch headers only, or None"""
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            if (reader.schema.metadata or {}).get(b'source_digest') != _snapshot_key(digest):
+                return None
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def _csv_rows(raw):
+    lines = raw.count(b"\n") + (1 if raw and not raw.endswith(b"\n") else 0)
+    return max(0, lines - 1)
+
+
+def write_snapshot(path, df, digest):
+    """Write df as an uncompressed Arrow IPC (Feather v2) file so it can be memory-mapped"""
+    if pa is None:
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'source_digest'] = _snapshot_key(digest)
+    # Parse-time validation reports travel with the parsed columns
+    metadata[b'validation'] = json.dumps(df.attrs.get('validation', [])).encode()
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # One record batch, so every column maps back as a single contiguous buffer
+        feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(1, len(df)))
+        os.replace(tmp_path, path)
+    except OSError:
+        # A read-only checkout still works, it just parses the CSV every cold start
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _parse(name, filename, prefix, raw, digest):
+    path = _snapshot_path(prefix, filename)
+    df = read_snapshot(path, digest)
+    if df is None:
+        df = _PARSERS[name](io.BytesIO(raw))
+        write_snapshot(path, df, digest)
+    elif name == 'nft_df':
+        # Re-attach the process-wide shared category dictionaries, and give the
+        # columns transfers write a private copy; the rest stay on the mapped pages
+        df = compact_ledger(df)
+        df = df.assign(**{column: df[column].copy() for column in MUTABLE_COLUMNS})
+    return df
+
+
+def _load(prefix, previous=None):
+    stats, digests, tables, pending = {}, {}, {}, {}
+    for name, filename in TABLE_FILES.items():
+        path = prefix + filename
+        stats[name] = _stat(path)
+        raw, digests[name] = _read(path)
+        if previous is not None and previous.digests[name] == digests[name]:
+            # Touched but unchanged: keep the already parsed (or still pending) table
+            with previous._load_lock:
+                if name in previous.tables:
+                    tables[name] = previous.tables[name]
+                else:
+                    pending[name] = previous._pending[name]
+        elif name in LAZY_TABLES:
+            rows = snapshot_rows(_snapshot_path(prefix, filename), digests[name])
+            # Keep the raw bytes only when there is no snapshot to parse from later
+            pending[name] = (raw, _csv_rows(raw)) if rows is None else (None, rows)
+        else:
+            tables[name] = _parse(name, filename, prefix, raw, digests[name])
+    tables['color_map'] = colors.color_map(prefix, tables['qaly_df'])
+    if previous is not None and 'nft_df' in tables and previous.tables.get('nft_df') is tables['nft_df']:
+        # Same ledger: share its one engine, and keep the views already registered as its listeners
+        engine = previous.engine
+        dataset = Dataset(prefix, stats, digests, tables, pending, engine)
+        with engine._lock:
+            dataset._cube = previous._cube
+            dataset._ledger_filter = previous._ledger_filter
+            dataset._history = previous._history
+        return dataset
+    return Dataset(prefix, stats, digests, tables, pending)
+
+
+def _is_stale(dataset):
+    now = time.monotonic()
+    if now - dataset.checked_at < STAT_INTERVAL:
+        return False
+    dataset.checked_at = now
+    # Pick up transfers logged by other worker processes; an engine not built yet replays them when it is
+    if dataset._engine is not None:
+        dataset._engine.catch_up()
+    try:
+        return any(
+            _stat(dataset.prefix + filename) != dataset.stats[name]
+            for name, filename in TABLE_FILES.items()
+        )
+    except OSError:
+        return True
+
+
+def discover_datasets(directory="."):
+    """Dataset prefixes with a QALY table in directory, e.g. ['', 'RRT_', 'VHW_']"""
+    suffix = TABLE_FILES['qaly_df']
+    return sorted(
+        name[:-len(suffix)] for name in os.listdir(directory)
+        if name.endswith(suffix) and all(
+            os.path.exists(os.path.join(directory, name[:-len(suffix)] + filename))
+            for filename in TABLE_FILES.values()
+        )
+    )
+
+
+def load_dataset(prefix):
+    """Return the cached Dataset for a prefix, reloading it if its files changed on disk"""
+    with _lock:
+        dataset = _cache.get(prefix)
+        if dataset is not None and not _is_stale(dataset):
+            _cache.move_to_end(prefix)
+            return dataset
+        load_lock = _load_locks.setdefault(prefix, threading.Lock())
+
+    # Parse outside the cache lock so different datasets can load concurrently
+    with load_lock:
+        with _lock:
+            current = _cache.get(prefix)
+        if current is not None and current is not dataset:
+            # Another thread reloaded it while we waited
+            return current
+        dataset = _load(prefix, previous=current)
+        with _lock:
+            _cache[prefix] = dataset
+            _cache.move_to_end(prefix)
+            _evict()
+        return dataset
+
+
+def build_cube_cells(prefix):
+    """Aggregation job run in a worker process: cube cells of a dataset's ledger
+
+    Returns the ledger version and transfer log offset the cells were built at."""
+    dataset = load_dataset(prefix)
+    with dataset.engine._lock:
+        return dataset.version, dataset.engine.log_offset, AggregateCube(dataset.nft_df).cells
+
+
+def _evict():
+    unused = [prefix for prefix, dataset in _cache.items() if dataset.refs == 0]
+    for prefix in unused[:max(0, len(_cache) - MAX_CACHED_DATASETS)]:
+        del _cache[prefix]
+
+
+class DatasetHandle:
+    """A session's reference to a shared Dataset, plus that session's pending edits
+
+    Sessions read the shared tables directly and never copy them. Edits that
+    are not committed yet are staged in the handle's overlay, per table."""
+
+    def __init__(self, dataset, overlay=None):
+        self.dataset = dataset
+        self.overlay = overlay if overlay is not None else {}
+        with _lock:
+            dataset.refs += 1
+        # Released when the session (and with it this handle) is garbage collected
+        self._finalizer = weakref.finalize(self, _release, dataset)
+
+    def release(self):
+        self._finalizer()
+
+    def stage(self, name, rows):
+        """Add pending rows for a table, visible only to this session"""
+        self.overlay.setdefault(name, []).append(rows)
+
+    def pending(self, name):
+        return self.overlay.get(name, [])
+
+    def discard(self, name):
+        self.overlay.pop(name, None)
+
+    def table(self, name):
+        """Shared table with this session's pending rows appended"""
+        base = self.dataset.table(name)
+        if not self.pending(name):
+            return base
+        return pd.concat([base] + self.pending(name), ignore_index=True)
+
+
+def _release(dataset):
+    with _lock:
+        dataset.refs -= 1
+        _evict()
+
+
+def acquire(prefix, handle=None):
+    """Return a handle on the current version of a dataset
+
+    An existing handle is returned unchanged while it still points at the
+    current version; otherwise it is released and its pending edits carried over."""
+    dataset = load_dataset(prefix)
+    if handle is not None and handle.dataset is dataset:
+        return handle
+    overlay = None
+    if handle is not None:
+        if handle.dataset.prefix == prefix:
+            overlay = handle.overlay
+        handle.release()
+    handle = DatasetHandle(dataset, overlay)
+    with _lock:
+        # Evicted by another load before the handle referenced it: keep it cached now that it is in use
+        if prefix not in _cache:
+            _cache[prefix] = dataset
+    return handle
+
+
+def acquire_datasets(prefixes=None, handles=None):
+    """Handles on several datasets, by default every discovered one, loaded concurrently
+
+    handles are the caller's previous {prefix: handle}; current ones are
+    reused and the rest released. Returns {prefix: DatasetHandle}."""
+    prefixes = discover_datasets() if prefixes is None else list(prefixes)
+    handles = dict(handles or {})
+    for prefix in set(handles) - set(prefixes):
+        handles.pop(prefix).release()
+    if not prefixes:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(prefixes)) as pool:
+        return dict(zip(prefixes, pool.map(lambda prefix: acquire(prefix, handles.get(prefix)), prefixes)))
+
+
+def invalidate(prefix=None):
+    """Drop cached tables for one dataset prefix, or for every dataset when prefix is None"""
+    with _lock:
+        if prefix is None:
+            _cache.clear()
+        else:
+            _cache.pop(prefix, None)
+
+
+def memory_report():
+    """Bytes held and live session references of each cached dataset, keyed by dataset prefix"""
+    with _lock:
+        return {
+            prefix: {'bytes': sum(dataset.memory_usage().values()), 'sessions': dataset.refs}
+            for prefix, dataset in _cache.items()
+        }
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Date formats tried, in order, when detecting the format of a column
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "ISO8601",
+]
+
+# Distinct values, most frequent first, sampled when detecting a column's format
+DETECT_SAMPLE = 1000
+
+# Bad values listed per column in a validation report
+REPORT_EXAMPLES = 5
+
+
+def detect_date_format(values, sample=DETECT_SAMPLE):
+    """The first of DATE_FORMATS that parses every sampled value, or the one parsing the most rows
+
+    Each sampled string counts as many times as it occurs. Returns None only
+    when no format parses any of the sample."""
+    counts = values.dropna().astype(str).value_counts()[:sample]
+    if counts.empty:
+        return None
+    strings = pd.Series(counts.index, dtype=object)
+    weights = counts.to_numpy()
+    best, best_rows = None, 0
+    for date_format in DATE_FORMATS:
+        parsed = pd.to_datetime(strings, format=date_format, errors='coerce').notna().to_numpy()
+        rows = weights[parsed].sum()
+        if rows == weights.sum():
+            return date_format
+        if rows > best_rows:
+            best, best_rows = date_format, rows
+    return best
+
+
+def parse_dates(values, column):
+    """Parse a column of date strings with one detected format and report the rows that failed
+
+    Each distinct string is parsed once. Returns (dates, report) where report
+    is a JSON-serialisable dict: column, format, rows, invalid and examples."""
+    date_format = detect_date_format(values)
+    codes, uniques = pd.factorize(values)
+    if date_format is None:
+        parsed = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[us]')
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object).astype(str), format=date_format, errors='coerce').to_numpy()
+    # Missing values have code -1, which picks the NaT appended at the end
+    dates = pd.Series(np.append(parsed, np.datetime64('NaT'))[codes], index=values.index, name=values.name)
+
+    bad = dates.isna() & values.notna()
+    examples = values[bad].head(REPORT_EXAMPLES)
+    report = {
+        'column': column,
+        'format': date_format,
+        'rows': int(len(values)),
+        'missing': int(values.isna().sum()),
+        'invalid': int(bad.sum()),
+        'examples': [{'row': int(row), 'value': str(value)} for row, value in examples.items()],
+    }
+    return dates, report
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+import instrumentation
+
+# Upper bound on the serialized figure JSON kept in memory, in bytes
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+
+def cached_figure(key, build):
+    """Return the Plotly figure for key, calling build() only when it is not cached
+
+    key must identify everything the figure depends on: a tuple of the data
+    version, the figure name, then the filter values used to build it."""
+    with _lock:
+        payload = _cache.get(key)
+        if payload is not None:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+    if payload is None:
+        with instrumentation.stage('figure_build', figure=key[1]):
+            payload = build().to_json()
+        with _lock:
+            _stats['misses'] += 1
+            if key not in _cache:
+                _cache[key] = payload
+                _stats['bytes'] += len(payload)
+            while _stats['bytes'] > MAX_CACHE_BYTES and len(_cache) > 1:
+                _, evicted = _cache.popitem(last=False)
+                _stats['bytes'] -= len(evicted)
+                _stats['evictions'] += 1
+    with instrumentation.stage('figure_load'):
+        return pio.from_json(payload, skip_invalid=True)
+
+
+def cache_stats():
+    """Hit, miss and eviction counters plus the number of cached figures and their size"""
+    with _lock:
+        return dict(_stats, entries=len(_cache))
+
+
+def clear():
+    """Drop every cached figure"""
+    with _lock:
+        _cache.clear()
+        _stats['bytes'] = 0
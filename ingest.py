@@ -0,0 +1,99 @@
+import os
+
+import pandas as pd
+
+import colors
+import data_loader
+from locks import file_lock
+
+# Columns of <dataset>QALY_data.csv, in file order
+QALY_SCHEMA = {
+    'Program ID': 'string',
+    'Program Name': 'string',
+    'Disease': 'string',
+    'Intervention': 'string',
+    'Patient': 'number',
+    'Survival Pop': 'number',
+    'Avg QALY Gain': 'number',
+    'Tot QALY Gain': 'number',
+    'Cost': 'number',
+}
+
+
+def validate_submission(incoming_data, program_id, program_name):
+    """Turn a submitted record or list of records into rows matching QALY_SCHEMA
+
+    Raises ValueError describing the first problem found."""
+    if isinstance(incoming_data, dict):
+        incoming_data = [incoming_data]
+    if not isinstance(incoming_data, list) or not incoming_data:
+        raise ValueError("Expected a record or a non-empty list of records")
+    if not all(isinstance(record, dict) for record in incoming_data):
+        raise ValueError("Every submitted record must be a JSON object")
+
+    df = pd.DataFrame(incoming_data)
+    df['Program ID'] = program_id
+    df['Program Name'] = program_name
+
+    unknown = [column for column in df.columns if column not in QALY_SCHEMA]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+    missing = [column for column in QALY_SCHEMA if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    for column, kind in QALY_SCHEMA.items():
+        if kind == 'number':
+            values = pd.to_numeric(df[column], errors='coerce')
+            if values.isna().any():
+                raise ValueError(f"Column '{column}' must be numeric")
+            df[column] = values
+        else:
+            if df[column].isna().any() or (df[column].astype(str).str.strip() == "").any():
+                raise ValueError(f"Column '{column}' must not be empty")
+            df[column] = df[column].astype(str)
+
+    return df[list(QALY_SCHEMA)]
+
+
+def append_rows(path, rows):
+    """Append rows to a CSV under the file lock, writing the header only for a new file"""
+    return append_chunks(path, [rows])
+
+
+def append_chunks(path, chunks):
+    """Append an iterable of DataFrame chunks to a CSV while holding the file lock once
+
+    Chunks are written as they are produced, so a generator keeps memory
+    bounded by one chunk. Returns the number of rows written."""
+    written = 0
+    with file_lock(path):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as f:
+                header = f.readline().decode('utf-8-sig').strip().split(",")
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+            if needs_newline:
+                with open(path, "a", encoding='utf-8') as f:
+                    f.write("\n")
+        for rows in chunks:
+            if exists and header != list(rows.columns):
+                raise ValueError(f"{path} has columns {header}, expected {list(rows.columns)}")
+            rows.to_csv(path, mode='a', header=not exists, index=False, lineterminator="\n")
+            header, exists = list(rows.columns), True
+            written += len(rows)
+    return written
+
+
+def ingest_submissions(dataset, submissions):
+    """Append a batch of validated submissions to a dataset's QALY table in one write
+
+    submissions is a list of DataFrames from validate_submission. Only the
+    target dataset's cached tables are invalidated."""
+    rows = pd.concat(submissions, ignore_index=True)
+    append_rows(dataset + data_loader.TABLE_FILES['qaly_df'], rows)
+    # New diseases and interventions get the next free colors; existing ones keep theirs
+    colors.register(dataset, colors.chart_labels(rows))
+    data_loader.invalidate(dataset)
+    return len(rows)
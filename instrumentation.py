@@ -0,0 +1,135 @@
+"""Timing and memory counters for the stages of an app rerun
+
+Each Streamlit rerun runs on its own script thread. begin_rerun() starts
+a record on that thread, every stage() block adds its wall time and
+resident-memory change to it, and end_rerun() folds it into process-wide
+totals per page, dataset and stage. Finished reruns are also logged as one
+JSON line each on the 'qaly.instrumentation' logger. Set QALY_METRICS_LOG
+to append them to a file as well.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("qaly.instrumentation")
+if os.environ.get("QALY_METRICS_LOG"):
+    _handler = logging.FileHandler(os.environ["QALY_METRICS_LOG"], encoding='utf-8')
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()
+_lock = threading.Lock()
+# (page, dataset, stage) -> {'calls', 'seconds', 'max_seconds', 'memory_bytes'}
+_totals = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'memory_bytes': 0})
+_last_reruns = {}
+
+
+def _rss():
+    """Resident memory of this process in bytes, 0 where it cannot be read"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak rather than current usage, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+def begin_rerun():
+    """Start recording the stages of the rerun running on this thread"""
+    _local.rerun = {
+        'page': None,
+        'dataset': None,
+        'started': time.time(),
+        'start': time.perf_counter(),
+        'stages': [],
+    }
+
+
+def set_labels(**labels):
+    """Attach the page and dataset to the current rerun once they are known"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun.update(labels)
+
+
+@contextmanager
+def stage(name, **detail):
+    """Time a block of the current rerun; a no-op outside begin_rerun()/end_rerun()"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        yield
+        return
+    memory = _rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun['stages'].append(dict(
+            detail,
+            stage=name,
+            seconds=time.perf_counter() - start,
+            memory_bytes=_rss() - memory,
+        ))
+
+
+def end_rerun():
+    """Finish the current rerun: add it to the totals, log it and return its record"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun['seconds'] = time.perf_counter() - rerun.pop('start')
+    page, dataset = rerun['page'] or "", rerun['dataset'] or ""
+    with _lock:
+        for entry in rerun['stages'] + [{'stage': 'rerun', 'seconds': rerun['seconds'], 'memory_bytes': 0}]:
+            totals = _totals[(page, dataset, entry['stage'])]
+            totals['calls'] += 1
+            totals['seconds'] += entry['seconds']
+            totals['max_seconds'] = max(totals['max_seconds'], entry['seconds'])
+            totals['memory_bytes'] += entry['memory_bytes']
+        _last_reruns[(page, dataset)] = rerun
+    logger.info(json.dumps(rerun, default=str))
+    return rerun
+
+
+def stage_totals():
+    """Accumulated stage counters as rows: page, dataset, stage, calls, seconds, mean and max"""
+    with _lock:
+        return [
+            {
+                'page': page,
+                'dataset': dataset,
+                'stage': name,
+                'calls': totals['calls'],
+                'seconds': totals['seconds'],
+                'mean_ms': totals['seconds'] / totals['calls'] * 1000,
+                'max_ms': totals['max_seconds'] * 1000,
+                'memory_mb': totals['memory_bytes'] / 1e6,
+            }
+            for (page, dataset, name), totals in sorted(_totals.items())
+        ]
+
+
+def last_rerun(page, dataset):
+    """Record of the most recent finished rerun of a page and dataset"""
+    with _lock:
+        return _last_reruns.get((page, dataset))
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+        _last_reruns.clear()
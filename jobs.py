@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Ledgers with fewer rows are aggregated inline; the process round trip would cost more
+BACKGROUND_MIN_ROWS = 200_000
+
+# Worker processes for background aggregation jobs
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_executor = None
+_in_flight = {}
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the Streamlit server process is multi-threaded
+        _executor = ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def submit(key, fn, *args):
+    """Run fn(*args) in the process pool, sharing one future between all callers of the same key
+
+    fn must be a module-level function whose arguments and result can be pickled."""
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _pool().submit(fn, *args)
+            _in_flight[key] = future
+            future.add_done_callback(lambda done: _forget(key, done))
+        return future
+
+
+def _forget(key, future):
+    with _lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+
+
+def completed(result):
+    """Future that already holds result, for work done inline"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def in_flight():
+    """Keys of the jobs currently queued or running"""
+    with _lock:
+        return list(_in_flight)
+
+
+def shutdown():
+    """Stop the worker processes; a later submit() starts a new pool"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
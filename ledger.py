@@ -0,0 +1,193 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+NFT_ID_PREFIX = "NFT-"
+NFT_ID_WIDTH = 6
+
+# Repeated string columns of the ledger, stored as categoricals
+CATEGORY_COLUMNS = ['program_id', 'disease', 'intervention', 'owner_id', 'status']
+
+# Columns the transfer engine updates in place; the others are never written after loading
+MUTABLE_COLUMNS = ['owner_id', 'transfer_count']
+
+# Column order of the ledger as stored on disk and shown in tables
+LEDGER_COLUMNS = ['nft_id', 'program_id', 'disease', 'intervention', 'owner_id',
+                  'status', 'mint_date', 'transfer_count', 'qaly_value']
+
+# Category dictionaries shared by every ledger loaded in this process, so datasets
+# with the same owners/diseases reuse one set of label strings
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+
+def format_nft_id(key):
+    """Format an integer NFT key for display, e.g. 1 -> 'NFT-000001'"""
+    return f"{NFT_ID_PREFIX}{int(key):0{NFT_ID_WIDTH}d}"
+
+
+def parse_nft_ids(values):
+    """Convert 'NFT-000001' style identifiers to integer keys"""
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype('int32')
+    digits = values.astype(str).str.removeprefix(NFT_ID_PREFIX)
+    if not digits.str.fullmatch(r"\d+").all():
+        bad = values[~digits.str.fullmatch(r"\d+")].iloc[0]
+        raise ValueError(f"Unrecognised NFT id: {bad!r}")
+    return digits.astype('int32')
+
+
+def id_prefix_ranges(query, max_id):
+    """Half-open nft_id ranges whose formatted ids start with the typed query
+
+    'NFT-0012' and '0012' match the zero-padded id. A bare number such as
+    '12' matches ids whose number starts with it: 12, 120-129, 1200-1299...
+    Returns None when the query is not an id prefix."""
+    query = query.strip().upper()
+    digits = query.removeprefix(NFT_ID_PREFIX)
+    if not digits.isdigit():
+        return None
+    if digits == query and not digits.startswith("0"):
+        number, ranges = int(digits), []
+        scale = 1
+        while number * scale <= max(max_id, number):
+            ranges.append((number * scale, (number + 1) * scale))
+            scale *= 10
+        return ranges
+    typed = len(digits)
+    ranges = []
+    width = max(typed, NFT_ID_WIDTH)
+    while 10 ** (width - 1) <= max(max_id, 1) or width == max(typed, NFT_ID_WIDTH):
+        scale = 10 ** (width - typed)
+        low, high = int(digits) * scale, (int(digits) + 1) * scale
+        if width > NFT_ID_WIDTH:
+            # Ids wider than the padding have no leading zeros
+            low = max(low, 10 ** (width - 1))
+        ranges.append((low, min(high, 10 ** width)))
+        width += 1
+    return [(low, high) for low, high in ranges if low < high]
+
+
+def _shared_dtype(column, labels):
+    with _dictionaries_lock:
+        labels = pd.Index(labels).astype(str)
+        known = _dictionaries.get(column)
+        if known is None or not labels.isin(known).all():
+            known = labels if known is None else known.union(labels)
+            _dictionaries[column] = known.sort_values()
+        return pd.CategoricalDtype(_dictionaries[column])
+
+
+def compact_ledger(df):
+    """Return the ledger with categorical labels, integer nft_id keys and narrow numeric dtypes
+
+    Columns already in their compact form, e.g. read back from a snapshot,
+    are only re-pointed at the shared category dictionaries, not converted."""
+    columns = {}
+    if df['nft_id'].dtype != 'int32':
+        columns['nft_id'] = parse_nft_ids(df['nft_id']).to_numpy()
+    for column in CATEGORY_COLUMNS:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            dtype = _shared_dtype(column, values.cat.categories)
+            if values.dtype != dtype:
+                columns[column] = values.cat.set_categories(dtype.categories)
+        else:
+            columns[column] = values.astype(_shared_dtype(column, values.dropna().unique()))
+    if df['transfer_count'].dtype != 'int16':
+        columns['transfer_count'] = df['transfer_count'].fillna(0).astype('int16')
+    if df['qaly_value'].dtype != 'float32':
+        columns['qaly_value'] = df['qaly_value'].astype('float32')
+    # assign() shares the untouched columns instead of copying the whole frame
+    return df.assign(**columns)
+
+
+def display_ledger(df, columns=None, rows=None):
+    """Copy of the rows about to be shown with nft_id formatted back to 'NFT-000001'
+
+    rows are optional row positions, e.g. from LedgerFilter.select, so only
+    the selected rows are ever copied out of the ledger."""
+    columns = LEDGER_COLUMNS if columns is None else columns
+    rows = slice(None) if rows is None else rows
+    view = df.iloc[rows, [df.columns.get_loc(column) for column in columns]].copy()
+    if 'nft_id' in view.columns:
+        view['nft_id'] = [format_nft_id(key) for key in view['nft_id']]
+    if 'qaly_value' in view.columns:
+        view['qaly_value'] = view['qaly_value'].astype('float64').round(4)
+    return view
+
+
+def memory_footprint(df):
+    """Deep memory usage of a DataFrame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+class LedgerFilter:
+    """Evaluates equality predicates on ledger columns against positional indexes
+
+    Each indexed column maps a value to the sorted row positions holding it,
+    so a filter is an intersection of position arrays rather than a boolean
+    scan, and the source ledger is never copied or modified."""
+
+    def __init__(self, nft_df, columns=('owner_id', 'disease', 'status')):
+        self.nft_df = nft_df
+        self.indexes = {
+            column: {
+                value: np.asarray(rows, dtype='int64')
+                for value, rows in nft_df.groupby(column, observed=True).indices.items()
+            }
+            for column in columns
+        }
+
+    def options(self, column):
+        """Sorted values present in an indexed column"""
+        return sorted(value for value, rows in self.indexes[column].items() if len(rows))
+
+    def select(self, **predicates):
+        """Row positions matching every column == value predicate; None values are ignored"""
+        selected = None
+        for column, value in predicates.items():
+            if value is None:
+                continue
+            rows = self.indexes[column].get(value, np.empty(0, dtype='int64'))
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        if selected is None:
+            return np.arange(len(self.nft_df))
+        return selected
+
+    def apply_transfer(self, rows, previous_owners):
+        """Move transferred rows between owner position lists"""
+        owners = self.indexes.get('owner_id')
+        if owners is None:
+            return
+        rows = np.asarray(rows, dtype='int64')
+        previous_owners = np.asarray(previous_owners, dtype=object)
+        new_owners = self.nft_df['owner_id'].to_numpy()[rows]
+        updated = dict(owners)
+        for owner in set(previous_owners.tolist()):
+            updated[owner] = np.setdiff1d(updated.get(owner, rows[:0]), rows[previous_owners == owner], assume_unique=True)
+        for owner in set(new_owners.tolist()):
+            updated[owner] = np.union1d(updated.get(owner, rows[:0]), rows[new_owners == owner])
+        self.indexes['owner_id'] = updated
+
+
+def sort_rows(df, rows, column, ascending=True):
+    """Reorder row positions by a ledger column, touching only those rows"""
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype) and values.cat.categories.is_monotonic_increasing:
+        # Category dictionaries are kept sorted, so codes order like the labels
+        keys = values.cat.codes.to_numpy()[rows]
+    else:
+        keys = values.to_numpy()[rows]
+    order = np.argsort(keys, kind='stable')
+    if not ascending:
+        order = order[::-1]
+    return rows[order]
+
+
+def page_rows(rows, page, page_size):
+    """Row positions on a 1-based page"""
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
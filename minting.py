@@ -0,0 +1,162 @@
+"""Mint ledger NFTs for QALYs accrued since the last mint
+
+Every whole QALY in a program's latest Cumulative QALYs becomes one NFT.
+A per-dataset watermark file records how many QALYs each program has
+minted, the qaly_value its NFTs carry in the ledger (1.0 for a program
+with no NFTs yet) and the next free nft_id, so each run only mints the
+delta in the ledger's own unit. New rows are generated and appended chunk
+by chunk, never as one frame.
+
+    python minting.py --dataset RRT_ --as-of 2026-01-01
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from ingest import append_chunks
+from ledger import LEDGER_COLUMNS, NFT_ID_PREFIX, NFT_ID_WIDTH, parse_nft_ids
+from locks import file_lock
+
+# Per dataset prefix: minted QALYs and token value per program, next nft_id and the ledger size they describe
+WATERMARK_FILE = "mint_watermarks.json"
+
+# qaly_value of an NFT minted for a program with no ledger rows yet: one whole QALY
+DEFAULT_TOKEN_VALUE = 1.0
+
+# Ledger rows generated and written per append
+CHUNK_ROWS = 50_000
+
+# Owner of freshly minted NFTs
+MINT_OWNER = "Admin Team"
+
+
+def _ledger_path(dataset):
+    return dataset + data_loader.TABLE_FILES['nft_df']
+
+
+def scan_ledger(path, chunk_rows=CHUNK_ROWS):
+    """Watermarks rebuilt from the ledger file itself, reading it chunk by chunk"""
+    minted = pd.Series(dtype='int64')
+    values = {}
+    next_id = 1
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        for chunk in pd.read_csv(path, usecols=['nft_id', 'program_id', 'qaly_value'], chunksize=chunk_rows):
+            minted = minted.add(chunk['program_id'].value_counts(), fill_value=0)
+            for program, value in chunk.groupby('program_id')['qaly_value'].first().items():
+                values.setdefault(str(program), float(value))
+            if len(chunk):
+                next_id = max(next_id, int(parse_nft_ids(chunk['nft_id']).max()) + 1)
+    return {
+        'next_nft_id': next_id,
+        'programs': {str(program): int(count) for program, count in minted.items()},
+        'values': values,
+        'ledger_bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+    }
+
+
+def load_watermarks(dataset):
+    """Current watermarks, rebuilt from the ledger when missing or when the ledger changed behind them"""
+    path = dataset + WATERMARK_FILE
+    ledger_path = _ledger_path(dataset)
+    ledger_bytes = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+    if os.path.exists(path):
+        with open(path, "r", encoding='utf-8') as f:
+            watermarks = json.load(f)
+        if watermarks.get('ledger_bytes') == ledger_bytes and 'values' in watermarks:
+            return watermarks
+    return scan_ledger(ledger_path)
+
+
+def save_watermarks(dataset, watermarks):
+    path = dataset + WATERMARK_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def accrued_qalys(time_series_df, as_of=None):
+    """Latest Cumulative QALYs of each program up to as_of, indexed by Program ID"""
+    ts = time_series_df
+    if as_of is not None:
+        ts = ts[ts['Date'] <= pd.Timestamp(as_of)]
+    return ts.sort_values('Date').groupby('Program ID')['Cumulative QALYs'].last()
+
+
+def plan_mints(accrued, watermarks):
+    """NFTs to mint per program: whole QALYs accrued beyond those already minted"""
+    minted = pd.Series(watermarks['programs'], dtype='int64').reindex(accrued.index, fill_value=0)
+    delta = np.floor(accrued.to_numpy(dtype='float64')).astype('int64') - minted.to_numpy()
+    plan = pd.Series(delta, index=accrued.index)
+    return plan[plan > 0]
+
+
+def mint_rows(plan, qaly_df, first_id, mint_date, values, owner=MINT_OWNER, chunk_rows=CHUNK_ROWS):
+    """Yield new ledger rows in chunks of at most chunk_rows, numbering nft_ids from first_id
+
+    values maps a program to the qaly_value its existing NFTs carry, so
+    minted NFTs use the same unit as the rest of the ledger."""
+    programs = qaly_df.drop_duplicates('Program ID').set_index('Program ID')
+    next_id = first_id
+    for program, count in plan.items():
+        info = programs.loc[program]
+        for start in range(0, int(count), chunk_rows):
+            size = min(chunk_rows, int(count) - start)
+            ids = np.arange(next_id, next_id + size)
+            next_id += size
+            yield pd.DataFrame({
+                'nft_id': [f"{NFT_ID_PREFIX}{nft_id:0{NFT_ID_WIDTH}d}" for nft_id in ids.tolist()],
+                'program_id': program,
+                'disease': info['Disease'],
+                'intervention': info['Intervention'],
+                'owner_id': owner,
+                'status': 'active',
+                'mint_date': mint_date,
+                'transfer_count': 0,
+                'qaly_value': values.get(str(program), DEFAULT_TOKEN_VALUE),
+            }, columns=LEDGER_COLUMNS)
+
+
+def mint(dataset, as_of=None, owner=MINT_OWNER, chunk_rows=CHUNK_ROWS):
+    """Mint NFTs for every program's QALYs accrued since the last mint and return the count per program
+
+    Runs under the watermark lock so concurrent minters never allocate the
+    same nft_ids. Only the small QALY and time series tables are read; the
+    ledger is scanned in chunks and appended to, never loaded whole. Only
+    the target dataset's cached tables are invalidated."""
+    qaly_df = data_loader.load_qaly_data(dataset + data_loader.TABLE_FILES['qaly_df'])
+    time_series_df = data_loader.generate_time_series_data(dataset + data_loader.TABLE_FILES['time_series_df'])
+    with file_lock(dataset + WATERMARK_FILE):
+        watermarks = load_watermarks(dataset)
+        plan = plan_mints(accrued_qalys(time_series_df, as_of), watermarks)
+        if plan.empty:
+            return plan
+        # Written with a fixed format so the whole ledger column parses with one format
+        mint_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+        rows = mint_rows(plan, qaly_df, watermarks['next_nft_id'], mint_date, watermarks['values'], owner, chunk_rows)
+        ledger_path = _ledger_path(dataset)
+        written = append_chunks(ledger_path, rows)
+
+        for program, count in plan.items():
+            watermarks['programs'][program] = watermarks['programs'].get(program, 0) + int(count)
+            watermarks['values'].setdefault(str(program), DEFAULT_TOKEN_VALUE)
+        watermarks['next_nft_id'] += written
+        watermarks['ledger_bytes'] = os.path.getsize(ledger_path)
+        save_watermarks(dataset, watermarks)
+    data_loader.invalidate(dataset)
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mint ledger NFTs for newly accrued QALYs")
+    parser.add_argument("--dataset", default="", help="dataset prefix, e.g. RRT_")
+    parser.add_argument("--as-of", default=None, help="only count accruals dated up to this day")
+    parser.add_argument("--owner", default=MINT_OWNER)
+    args = parser.parse_args()
+    plan = mint(args.dataset, args.as_of, args.owner)
+    print(f"Minted {int(plan.sum())} NFTs across {len(plan)} programs")
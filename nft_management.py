@@ -0,0 +1,234 @@
+import streamlit as st
+import plotly.express as px
+
+import instrumentation
+from figure_cache import cached_figure
+from ledger import LEDGER_COLUMNS, display_ledger, page_rows, sort_rows
+
+def render():
+    data = st.session_state.dataset_handle.dataset
+    nft_df = data.nft_df
+    color_map = st.session_state.color_map
+    # Ledger charts change with the files and with every transfer
+    ledger_version = f"{st.session_state.data_version}:{data.engine.sequence}"
+
+    st.markdown("""
+    <div class='main-header'>
+        <h1>NFT Management Dashboard</h1>
+        <p>Each NFT represents a single QALY from risk reduction programs</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # All metrics and charts on this page are slices of the ledger's aggregate cube.
+    # On large ledgers the cube is built in the background: the page shell renders
+    # with placeholders that are filled in once it is ready.
+    with instrumentation.stage('aggregate'):
+        cube_future = data.cube_future()
+    pending_renders = []
+
+    def deferred(render):
+        placeholder = st.empty()
+        if cube_future.done():
+            with placeholder.container():
+                render(cube_future.result())
+        else:
+            placeholder.info("Aggregating ledger...")
+            pending_renders.append((placeholder, render))
+
+    # NFT Summary metrics
+    def render_metrics(cube):
+        totals = cube.totals()
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            total_nfts = totals['nfts']
+            st.metric("Total NFTs", f"{total_nfts:,}")
+        
+        with col2:
+            active_nfts = totals['active']
+            st.metric("Active NFTs", f"{active_nfts:,}")
+        
+        with col3:
+            unique_owners = totals['owners']
+            st.metric("Unique Owners", unique_owners)
+        
+        with col4:
+            total_transfers = totals['transfers']
+            st.metric("Total Transfers", f"{total_transfers:,}")
+
+    deferred(render_metrics)
+    
+    # NFT Management tabs
+    tab1, tab2, tab3, tab4 = st.tabs(["NFT Overview", "Ownership", "Analytics", "NFT Details"])
+    
+
+    with tab1:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+
+            st.subheader("NFT Distribution by Disease")
+            deferred(lambda cube: st.plotly_chart(cached_figure((ledger_version, 'disease_nfts'), lambda: px.bar(
+                cube.slice(['disease'])[['disease', 'count']],
+                x='disease',
+                y='count',
+                color='disease',
+                color_discrete_map=color_map,
+                title="NFT Count by Disease Category"
+            )), use_container_width=True))
+        
+        with col2:
+            st.subheader("NFT Status Distribution")
+            deferred(lambda cube: st.plotly_chart(cached_figure((ledger_version, 'status_nfts'), lambda: px.pie(
+                cube.slice(['status'])[['status', 'count']].sort_values('count', ascending=False),
+                values='count',
+                names='status',
+                title="NFT Status Distribution"
+            )), use_container_width=True))
+    
+    with tab2:
+        st.subheader("Ownership Distribution")
+        
+        def render_ownership(cube):
+            ownership_stats = cube.slice(['owner_id'])
+            ownership_stats.columns = ['Owner', 'NFT Count', 'Total QALY Value', 'Total Transfers']
+            ownership_stats['Total QALY Value'] = ownership_stats['Total QALY Value'].astype('float64').round(4)
+            ownership_stats = ownership_stats.sort_values('NFT Count', ascending=False)
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                def build_ownership():
+                    fig = px.bar(
+                        ownership_stats,
+                        x='Owner',
+                        y='NFT Count',
+                        color='Total QALY Value',
+                        title="NFT Holdings by Owner",
+                        color_continuous_scale='viridis'
+                    )
+                    fig.update_xaxes(tickangle=45)
+                    return fig
+
+                fig = cached_figure((ledger_version, 'ownership'), build_ownership)
+                st.plotly_chart(fig, use_container_width=True)
+            
+            with col2:
+                st.subheader("Top Owners")
+                with instrumentation.stage('dataframe', table='top_owners'):
+                    st.dataframe(
+                        ownership_stats.head(10),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+        deferred(render_ownership)
+    
+    with tab3:
+        st.subheader("NFT Transfer Analytics")
+        
+        def render_analytics(cube):
+            def build_mint_timeline():
+                # Transfer timeline
+                monthly_mints = cube.slice(['mint_month']).dropna(subset=['mint_month'])
+                monthly_mints = monthly_mints.sort_values('mint_month').rename(columns={'count': 'mints'})[['mint_month', 'mints']]
+                monthly_mints['mint_month'] = monthly_mints['mint_month'].astype(str)
+
+                fig = px.line(
+                    monthly_mints,
+                    x='mint_month',
+                    y='mints',
+                    title="NFT Minting Timeline",
+                    markers=True
+                )
+                fig.update_xaxes(tickangle=45)
+                return fig
+
+            fig = cached_figure((ledger_version, 'mint_timeline'), build_mint_timeline)
+            st.plotly_chart(fig, use_container_width=True)
+
+            def build_transfer_matrix():
+                # Transfer heatmap
+                transfer_matrix = cube.slice(['disease', 'intervention'])
+                transfer_matrix['transfer_count'] = transfer_matrix['transfer_count'] / transfer_matrix['count']
+                transfer_matrix = transfer_matrix.rename(columns={'count': 'nft_id'})
+
+                return px.scatter(
+                    transfer_matrix,
+                    x='disease',
+                    y='intervention',
+                    size='nft_id',
+                    color='transfer_count',
+                    title="NFT Transfer Activity Heatmap",
+                    labels={'transfer_count': 'Avg Transfers per NFT'}
+                )
+
+            fig = cached_figure((ledger_version, 'transfer_matrix'), build_transfer_matrix)
+            st.plotly_chart(fig, use_container_width=True)
+
+        deferred(render_analytics)
+    
+    with tab4:
+        st.subheader("NFT Detailed View")
+        
+        # Search and filter
+        ledger_filter = data.ledger_filter
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            search_owner = st.selectbox("Filter by Owner:", ['All'] + ledger_filter.options('owner_id'), key="search_owner")
+        with col2:
+            search_disease = st.selectbox("Filter by Disease:", ['All'] + ledger_filter.options('disease'), key="search_disease")
+        with col3:
+            search_status = st.selectbox("Filter by Status:", ['All'] + ledger_filter.options('status'), key="search_status")
+        
+        # Apply filters against the positional indexes; the shared ledger is not copied
+        with instrumentation.stage('filter'):
+            filtered_rows = ledger_filter.select(
+                owner_id=None if search_owner == 'All' else search_owner,
+                disease=None if search_disease == 'All' else search_disease,
+                status=None if search_status == 'All' else search_status,
+            )
+        
+        # Sort and paginate server-side so only the visible page is sent to the browser
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            sort_column = st.selectbox("Sort by:", LEDGER_COLUMNS, key="sort_column")
+        with col2:
+            sort_order = st.selectbox("Order:", ["Ascending", "Descending"], key="sort_order")
+        with col3:
+            page_size = st.selectbox("Rows per page:", [25, 50, 100, 250], index=1, key="page_size")
+        page_count = max(1, -(-len(filtered_rows) // page_size))
+        with col4:
+            page_number = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1)
+
+        with instrumentation.stage('sort'):
+            sorted_rows = sort_rows(nft_df, filtered_rows, sort_column, sort_order == "Ascending")
+            visible_rows = page_rows(sorted_rows, page_number, page_size)
+
+        # Display filtered NFTs
+        first_row = (page_number - 1) * page_size
+        st.write(f"Showing {len(filtered_rows)} NFTs (rows {first_row + min(1, len(visible_rows))}-{first_row + len(visible_rows)})")
+        with instrumentation.stage('dataframe', table='nft_details'):
+            st.dataframe(
+                display_ledger(nft_df, rows=visible_rows),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "mint_date": st.column_config.DatetimeColumn(
+                        "Mint Date",
+                        format="DD/MM/YYYY"
+                    ),
+                    "qaly_value": st.column_config.NumberColumn(
+                        "QALY Value",
+                        format="%.4f"
+                    )
+                }
+            )
+
+    # Stream the cube-based sections in once the background aggregation finishes
+    if pending_renders:
+        with instrumentation.stage('aggregate', background=True):
+            cube = cube_future.result()
+        for placeholder, render in pending_renders:
+            with placeholder.container():
+                render(cube)
@@ -1,6 +1,9 @@
 import streamlit as st
 import plotly.express as px
-import numpy as np
+
+from figure_cache import cached_figure
+from psa import DEFAULT_COST_CV, DEFAULT_ITERATIONS, DEFAULT_QALY_CV, cached_psa
+from resources import references
 
 def show_references_from_dict(references: dict, section_title: str = "References"):
     with st.expander(section_title):
@@ -9,8 +12,10 @@ def show_references_from_dict(references: dict, section_title: str = "References
 
 def render():
     dataset = st.session_state.dataset
+    data_version = st.session_state.data_version
     qaly_df = st.session_state.qaly_df
-    nft_df = st.session_state.nft_df
+    # Only the ledger's row count is shown here, so the ledger itself is never parsed for this page
+    data = st.session_state.dataset_handle.dataset
     time_series_df = st.session_state.time_series_df
     color_map = st.session_state.color_map
     disease_colors = color_map
@@ -36,7 +41,7 @@ def render():
         )
     
     with col2:
-        total_nfts = len(nft_df)
+        total_nfts = data.ledger_rows
         st.metric(
             label="Total NFTs Minted",
             value=f"{total_nfts:,}",
@@ -79,31 +84,35 @@ def render():
         st.subheader("QALY Attribution")
         
         if drill_down_option == "By Disease":
-            # Main pie chart showing diseases
-            fig1 = px.pie(
-                disease_summary, 
-                values='Tot QALY Gain', 
-                names='Disease',
-                color='Disease',
-                color_discrete_map=disease_colors,
-                title="Total QALYs by Disease Category"
-            )
-            fig1.update_traces(
-                textposition='inside', 
-                textinfo='percent+label',
-                textfont_size=12,
-                hovertemplate="<b>%{label}</b><br>" +
-                             "Total QALY Gain: %{value}<br>" +
-                             "Patients: %{customdata[0]:,}<br>" +
-                             "Percentage: %{percent}<br>" +
-                             "<extra></extra>",
-                customdata=disease_summary[['Patient']]
-            )
-            fig1.update_layout(
-                showlegend=True,
-                height=400,
-                font=dict(size=10)
-            )
+            def build_disease_pie():
+                # Main pie chart showing diseases
+                fig1 = px.pie(
+                    disease_summary, 
+                    values='Tot QALY Gain', 
+                    names='Disease',
+                    color='Disease',
+                    color_discrete_map=disease_colors,
+                    title="Total QALYs by Disease Category"
+                )
+                fig1.update_traces(
+                    textposition='inside', 
+                    textinfo='percent+label',
+                    textfont_size=12,
+                    hovertemplate="<b>%{label}</b><br>" +
+                                 "Total QALY Gain: %{value}<br>" +
+                                 "Patients: %{customdata[0]:,}<br>" +
+                                 "Percentage: %{percent}<br>" +
+                                 "<extra></extra>",
+                    customdata=disease_summary[['Patient']]
+                )
+                fig1.update_layout(
+                    showlegend=True,
+                    height=400,
+                    font=dict(size=10)
+                )
+                return fig1
+
+            fig1 = cached_figure((data_version, 'disease_pie'), build_disease_pie)
             st.plotly_chart(fig1, use_container_width=True)
             
         else:
@@ -117,96 +126,144 @@ def render():
             # Filter data for selected disease
             filtered_data = qaly_df[qaly_df['Disease'] == selected_disease]
             
-            # Create drill-down pie chart with consistent colors
-            fig1 = px.pie(
-                filtered_data,
-                values='Tot QALY Gain',
-                names='Intervention',
-                color='Intervention',
-                color_discrete_map=intervention_colors,
-                title=f"QALY Distribution: {selected_disease} Interventions"
-            )
-            fig1.update_traces(
-                textposition='inside', 
-                textinfo='percent+label',
-                textfont_size=10,
-                hovertemplate="<b>%{label}</b><br>" +
-                             "QALY Gain: %{value}<br>" +
-                             "Patients: %{customdata[0]:,}<br>" +
-                             "Percentage: %{percent}<br>" +
-                             "<extra></extra>",
-                customdata=filtered_data[['Patient']]
-            )
-            fig1.update_layout(
-                showlegend=True,
-                height=400,
-                font=dict(size=9)
-            )
+            def build_intervention_pie():
+                # Create drill-down pie chart with consistent colors
+                fig1 = px.pie(
+                    filtered_data,
+                    values='Tot QALY Gain',
+                    names='Intervention',
+                    color='Intervention',
+                    color_discrete_map=intervention_colors,
+                    title=f"QALY Distribution: {selected_disease} Interventions"
+                )
+                fig1.update_traces(
+                    textposition='inside', 
+                    textinfo='percent+label',
+                    textfont_size=10,
+                    hovertemplate="<b>%{label}</b><br>" +
+                                 "QALY Gain: %{value}<br>" +
+                                 "Patients: %{customdata[0]:,}<br>" +
+                                 "Percentage: %{percent}<br>" +
+                                 "<extra></extra>",
+                    customdata=filtered_data[['Patient']]
+                )
+                fig1.update_layout(
+                    showlegend=True,
+                    height=400,
+                    font=dict(size=9)
+                )
+                return fig1
+
+            fig1 = cached_figure((data_version, 'intervention_pie', selected_disease), build_intervention_pie)
             st.plotly_chart(fig1, use_container_width=True)
 
     with col2:
         st.subheader("Cost-Effectiveness Analysis")
         
-        if drill_down_option == "By Disease":
-            # Scatter plot colored by disease
-            fig2 = px.scatter(
-                qaly_df,
-                x='Avg QALY Gain',
-                y='Cost per QALY',
-                size='Tot QALY Gain',
-                color='Disease',
-                color_discrete_map=disease_colors,
-                hover_name='Program Name',
-                hover_data={'Patient': ':,', 'Cost': ':$,'},
-                title="Cost per QALY vs Average QALY Gain (by Disease)",
-                labels={
-                    'Cost per QALY': 'Cost per QALY ($)', 
-                    'Avg QALY Gain': 'Average QALY Gain per Patient',
-                    'Tot QALY Gain': 'Total QALY Gain'
-                }
-            )
+        def build_cost_effectiveness():
+            if drill_down_option == "By Disease":
+                # Scatter plot colored by disease
+                fig2 = px.scatter(
+                    qaly_df,
+                    x='Avg QALY Gain',
+                    y='Cost per QALY',
+                    size='Tot QALY Gain',
+                    color='Disease',
+                    color_discrete_map=disease_colors,
+                    hover_name='Program Name',
+                    hover_data={'Patient': ':,', 'Cost': ':$,'},
+                    title="Cost per QALY vs Average QALY Gain (by Disease)",
+                    labels={
+                        'Cost per QALY': 'Cost per QALY ($)', 
+                        'Avg QALY Gain': 'Average QALY Gain per Patient',
+                        'Tot QALY Gain': 'Total QALY Gain'
+                    }
+                )
+                
+            else:
+                # Filter data for selected disease and color by intervention
+                filtered_data = qaly_df[qaly_df['Disease'] == selected_disease]
+                
+                fig2 = px.scatter(
+                    filtered_data,
+                    x='Avg QALY Gain',
+                    y='Cost per QALY',
+                    size='Tot QALY Gain',
+                    color='Intervention',
+                    color_discrete_map=intervention_colors,
+                    hover_name='Program Name',
+                    hover_data={'Patient': ':,', 'Cost': ':$,'},
+                    title=f"Cost-Effectiveness: {selected_disease} Interventions",
+                    labels={
+                        'Cost per QALY': 'Cost per QALY ($)', 
+                        'Avg QALY Gain': 'Average QALY Gain per Patient',
+                        'Tot QALY Gain': 'Total QALY Gain'
+                    }
+                )
             
-        else:
-            # Filter data for selected disease and color by intervention
-            filtered_data = qaly_df[qaly_df['Disease'] == selected_disease]
-            
-            fig2 = px.scatter(
-                filtered_data,
-                x='Avg QALY Gain',
-                y='Cost per QALY',
-                size='Tot QALY Gain',
-                color='Intervention',
-                color_discrete_map=intervention_colors,
-                hover_name='Program Name',
-                hover_data={'Patient': ':,', 'Cost': ':$,'},
-                title=f"Cost-Effectiveness: {selected_disease} Interventions",
-                labels={
-                    'Cost per QALY': 'Cost per QALY ($)', 
-                    'Avg QALY Gain': 'Average QALY Gain per Patient',
-                    'Tot QALY Gain': 'Total QALY Gain'
-                }
+            # Update scatter plot layout
+            fig2.update_traces(
+                hovertemplate="<b>%{hovertext}</b><br>" +
+                             "Avg QALY Gain: %{x}<br>" +
+                             "Cost per QALY: $%{y:,.0f}<br>" +
+                             "Total QALY Gain: %{marker.size}<br>" +
+                             "Patients: %{customdata[0]:,}<br>" +
+                             "Total Cost: %{customdata[1]}<br>" +
+                             "<extra></extra>"
             )
+            fig2.update_layout(
+                showlegend=True,
+                height=400,
+                yaxis_type="log",  # Log scale for better visualization of cost differences
+                font=dict(size=10)
+            )
+            return fig2
         
-        # Update scatter plot layout
-        fig2.update_traces(
-            hovertemplate="<b>%{hovertext}</b><br>" +
-                         "Avg QALY Gain: %{x}<br>" +
-                         "Cost per QALY: $%{y:,.0f}<br>" +
-                         "Total QALY Gain: %{marker.size}<br>" +
-                         "Patients: %{customdata[0]:,}<br>" +
-                         "Total Cost: %{customdata[1]}<br>" +
-                         "<extra></extra>"
-        )
-        fig2.update_layout(
-            showlegend=True,
-            height=400,
-            yaxis_type="log",  # Log scale for better visualization of cost differences
-            font=dict(size=10)
-        )
-        
+        scatter_key = None if drill_down_option == "By Disease" else selected_disease
+        fig2 = cached_figure((data_version, 'cost_effectiveness', scatter_key), build_cost_effectiveness)
         st.plotly_chart(fig2, use_container_width=True)
 
-    import json
-    f = open(dataset + "references.json","r", encoding = 'utf-8-sig')
-    references = json.load(f)
-    show_references_from_dict(references)
\ No newline at end of file
+    with st.expander("Probabilistic Sensitivity Analysis"):
+        st.caption("Samples survival, QALY gain and cost for every program and shows how likely each program is to be cost-effective")
+        psa_col1, psa_col2, psa_col3 = st.columns(3)
+        with psa_col1:
+            iterations = st.select_slider("Iterations", options=[1_000, 5_000, 10_000, 20_000, 50_000], value=DEFAULT_ITERATIONS)
+        with psa_col2:
+            qaly_cv = st.slider("QALY gain uncertainty (CV %)", 0, 100, int(DEFAULT_QALY_CV * 100), step=5) / 100
+        with psa_col3:
+            cost_cv = st.slider("Cost uncertainty (CV %)", 0, 100, int(DEFAULT_COST_CV * 100), step=5) / 100
+
+        psa_params = dict(iterations=iterations, qaly_cv=qaly_cv, cost_cv=cost_cv)
+        psa_summary, ceac = cached_psa(data_version, qaly_df, **psa_params)
+        if drill_down_option != "By Disease":
+            psa_summary = psa_summary[psa_summary['Disease'] == selected_disease]
+            ceac = ceac[ceac['Disease'] == selected_disease]
+
+        def build_ceac():
+            fig = px.line(
+                ceac,
+                x='Willingness to Pay',
+                y='Probability',
+                color='Program Name',
+                title="Cost-Effectiveness Acceptability Curves",
+                labels={'Willingness to Pay': 'Willingness to Pay per QALY ($)', 'Probability': 'Probability Cost-Effective'}
+            )
+            fig.update_layout(height=400, font=dict(size=10), yaxis_range=[0, 1])
+            return fig
+
+        ceac_key = None if drill_down_option == "By Disease" else selected_disease
+        fig3 = cached_figure((data_version, 'ceac', ceac_key, tuple(sorted(psa_params.items()))), build_ceac)
+        st.plotly_chart(fig3, use_container_width=True)
+
+        st.dataframe(
+            psa_summary.drop(columns='Disease'),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                column: st.column_config.NumberColumn(column, format="$%.0f")
+                for column in ['Cost per QALY', 'Mean', 'Median', 'CI Low', 'CI High']
+            }
+        )
+        st.caption("CI Low and CI High bound the 95% interval of cost per QALY across iterations")
+
+    show_references_from_dict(references(dataset))
\ No newline at end of file
@@ -0,0 +1,39 @@
+import importlib
+import os
+import threading
+
+# Navigation label -> module with a render() function, imported the first time the page is shown
+PAGES = {
+    "Overview": "overview",
+    "Program Dashboard": "program_dashboard",
+    "NFT Management": "nft_management",
+    "Transfer NFTs": "transfer_nfts",
+    "Portfolio": "portfolio",
+}
+
+# Set QALY_PREWARM=0 to keep unvisited pages (and their libraries) out of memory
+PREWARM = os.environ.get("QALY_PREWARM", "1") != "0"
+
+_prewarm_started = threading.Event()
+
+
+def load_page(page):
+    """Module of a navigation page, importing it on first use"""
+    return importlib.import_module(PAGES[page])
+
+
+def _import_all():
+    for module in PAGES.values():
+        try:
+            importlib.import_module(module)
+        except Exception:
+            # The page reports its own import error when it is opened
+            pass
+
+
+def prewarm():
+    """Import the remaining pages in the background, once per process, after the first page has rendered"""
+    if not PREWARM or _prewarm_started.is_set():
+        return
+    _prewarm_started.set()
+    threading.Thread(target=_import_all, name="page-prewarm", daemon=True).start()
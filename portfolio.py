@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from cube import AggregateCube
+from data_loader import acquire_datasets
+from figure_cache import cached_figure
+
+# Merged portfolios kept in memory, keyed on the versions of their datasets
+MAX_CACHED_PORTFOLIOS = 2
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def dataset_label(prefix):
+    """Name shown for a dataset prefix, e.g. 'RRT_' -> 'RRT'"""
+    return prefix.rstrip("_") or "Main"
+
+
+class Portfolio:
+    """Every dataset's programs and NFT aggregates merged, tagged with a 'dataset' column or level"""
+
+    def __init__(self, datasets):
+        labels = {prefix: dataset_label(prefix) for prefix in datasets}
+        self.programs = pd.concat(
+            [data.qaly_df.assign(Dataset=labels[prefix]) for prefix, data in datasets.items()],
+            ignore_index=True,
+        )
+        # Per-dataset cubes stacked under a leading 'dataset' level; a snapshot, so no transfer deltas
+        cubes = {labels[prefix]: data.cube_future() for prefix, data in datasets.items()}
+        self.cube = AggregateCube(None, pd.concat(
+            {label: future.result().cells for label, future in cubes.items()}, names=['dataset'],
+        ))
+        self.summary = self._summarize()
+
+    def _summarize(self):
+        programs = self.programs.groupby('Dataset', sort=False).agg(**{
+            'Programs': ('Program ID', 'size'),
+            'Patients': ('Patient', 'sum'),
+            'Total QALYs': ('Tot QALY Gain', 'sum'),
+            'Avg Cost per QALY': ('Cost per QALY', 'mean'),
+        })
+        nfts = self.cube.slice(['dataset', 'status']).pivot_table(
+            index='dataset', columns='status', values='count', aggfunc='sum', fill_value=0, observed=True,
+        )
+        owners = self.cube.slice(['dataset', 'owner_id'])
+        ledger = pd.DataFrame({
+            'NFTs': nfts.sum(axis=1),
+            'Active NFTs': nfts['active'] if 'active' in nfts else 0,
+            'Owners': owners[owners['count'] > 0].groupby('dataset')['owner_id'].nunique(),
+            'Transfers': self.cube.slice(['dataset']).set_index('dataset')['transfer_count'],
+        })
+        return programs.join(ledger).rename_axis('Dataset').reset_index()
+
+
+def portfolio_version(datasets):
+    """Cache key covering every dataset's files and transfers"""
+    return tuple((prefix, data.version, data.engine.sequence) for prefix, data in datasets.items())
+
+
+def load_portfolio(handles):
+    """Cached merged Portfolio of the datasets behind {prefix: DatasetHandle}, and its version"""
+    datasets = {prefix: handle.dataset for prefix, handle in handles.items()}
+    version = portfolio_version(datasets)
+    with _lock:
+        portfolio = _cache.get(version)
+        if portfolio is not None:
+            _cache.move_to_end(version)
+            return portfolio, version
+    portfolio = Portfolio(datasets)
+    with _lock:
+        _cache[version] = portfolio
+        while len(_cache) > MAX_CACHED_PORTFOLIOS:
+            _cache.popitem(last=False)
+    return portfolio, version
+
+
+def render():
+    st.markdown("""
+    <div class='main-header'>
+        <h1>Portfolio</h1>
+        <p>All country programs and their NFTs in one view</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    with st.spinner("Loading all datasets..."):
+        # Held across reruns so the dataset cache never evicts what this page shows
+        handles = acquire_datasets(handles=st.session_state.get('portfolio_handles'))
+        st.session_state.portfolio_handles = handles
+        portfolio, version = load_portfolio(handles)
+    programs = portfolio.programs
+    summary = portfolio.summary
+    totals = portfolio.cube.totals()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Datasets", len(summary))
+    with col2:
+        st.metric("Total QALYs Generated", f"{programs['Tot QALY Gain'].sum():,.0f}")
+    with col3:
+        st.metric("Total NFTs Minted", f"{totals['nfts']:,}")
+    with col4:
+        st.metric("Total Transfers", f"{totals['transfers']:,}")
+
+    st.dataframe(
+        summary,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Avg Cost per QALY": st.column_config.NumberColumn("Avg Cost per QALY", format="$%.0f"),
+            "Total QALYs": st.column_config.NumberColumn("Total QALYs", format="%.0f"),
+        }
+    )
+
+    tab1, tab2 = st.tabs(["Programs", "NFT Analytics"])
+
+    with tab1:
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = cached_figure((version, 'portfolio_qalys'), lambda: px.bar(
+                programs.groupby(['Dataset', 'Disease'], sort=False)['Tot QALY Gain'].sum().reset_index(),
+                x='Disease',
+                y='Tot QALY Gain',
+                color='Dataset',
+                title="Total QALYs by Disease and Dataset"
+            ))
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            def build_cost_effectiveness():
+                fig = px.scatter(
+                    programs,
+                    x='Avg QALY Gain',
+                    y='Cost per QALY',
+                    size='Tot QALY Gain',
+                    color='Dataset',
+                    hover_name='Program Name',
+                    title="Cost per QALY vs Average QALY Gain (all datasets)"
+                )
+                fig.update_layout(yaxis_type="log")
+                return fig
+
+            fig = cached_figure((version, 'portfolio_cost_effectiveness'), build_cost_effectiveness)
+            st.plotly_chart(fig, use_container_width=True)
+
+    with tab2:
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = cached_figure((version, 'portfolio_status'), lambda: px.bar(
+                portfolio.cube.slice(['dataset', 'status']),
+                x='dataset',
+                y='count',
+                color='status',
+                title="NFTs by Dataset and Status",
+                labels={'dataset': 'Dataset', 'count': 'NFTs'}
+            ))
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = cached_figure((version, 'portfolio_owners'), lambda: px.bar(
+                portfolio.cube.slice(['dataset', 'owner_id']).query('count > 0'),
+                x='owner_id',
+                y='qaly_value',
+                color='dataset',
+                title="QALY Value Held by Owner",
+                labels={'owner_id': 'Owner', 'qaly_value': 'QALY Value', 'dataset': 'Dataset'}
+            ))
+            st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,167 @@
+import streamlit as st
+import plotly.express as px
+from datetime import datetime, timedelta
+
+import instrumentation
+from figure_cache import cached_figure
+from timeseries import ZOOM_LEVELS, prepare_chart_data
+
+def render():
+    qaly_df = st.session_state.qaly_df
+    time_series_df = st.session_state.time_series_df
+    data_version = st.session_state.data_version
+
+    st.markdown("""
+    <div class='main-header'>
+        <h1>Program Dashboard</h1>
+        <p>Comprehensive analysis of disease risk reduction programs</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_diseases = st.multiselect(
+            "Filter by Disease:",
+            options=qaly_df['Disease'].unique(),
+            default=qaly_df['Disease'].unique()[-1],
+        )
+    
+    with col2:
+        selected_interventions = st.multiselect(
+            "Filter by Intervention:",
+            options=qaly_df['Intervention'].unique(),
+            default=qaly_df[qaly_df['Disease']==qaly_df['Disease'].unique()[-1]]['Intervention'].unique()
+        )
+    
+    with col3:
+        # Unreadable dates are reported in the sidebar; default to the past year when none parsed
+        valid_dates = time_series_df['Date'].dropna()
+        date_range = st.date_input(
+            "Date Range:",
+            value=(valid_dates.min().date(), valid_dates.max().date()) if len(valid_dates)
+                else (datetime.now() - timedelta(days=365), datetime.now()),
+            help="Filter time series data by date range"
+        )
+    
+    # Filter data
+    filtered_df = qaly_df[
+        (qaly_df['Disease'].isin(selected_diseases)) &
+        (qaly_df['Intervention'].isin(selected_interventions))
+    ]
+    
+    program_filter = (tuple(selected_diseases), tuple(selected_interventions))
+
+    # Tabs for different views
+    tab1, tab2, tab3, tab4 = st.tabs(["Time Series", "Program Map", "Bubble Analysis", "Data Table"])
+    with tab1:
+        st.subheader("QALY Accrual Over Time")
+        zoom = st.radio("Zoom Level:", list(ZOOM_LEVELS), horizontal=True)
+        
+        # Filter time series data
+        filtered_ts = time_series_df[
+            time_series_df['Program ID'].isin(filtered_df['Program ID'])
+        ]
+        
+        time_series_key = (program_filter, tuple(date_range), zoom)
+
+        def build_accrual():
+            fig = px.area(
+                prepare_chart_data(filtered_ts, date_range, zoom, 'Cumulative QALYs'),
+                x='Date',
+                y='Cumulative QALYs',
+                color='Program Name',
+                title="Cumulative QALY Generation Over 10-Year Program Span",
+                labels={'Cumulative QALYs': 'Cumulative QALYs', 'Date': 'Program Timeline'}
+            )
+            fig.update_layout(hovermode='x unified')
+            return fig
+
+        fig = cached_figure((data_version, 'accrual') + time_series_key, build_accrual)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Annual breakdown
+        st.subheader("Annual QALY Generation")
+        annual_fig = cached_figure((data_version, 'annual') + time_series_key, lambda: px.bar(
+            prepare_chart_data(filtered_ts, date_range, zoom, 'Annual QALYs'),
+            x='Year',
+            y='Annual QALYs',
+            color='Disease',
+            facet_col='Program Name',
+            facet_col_wrap=4,
+            title="Annual QALY Generation by Program"
+        ))
+        st.plotly_chart(annual_fig, use_container_width=True)
+    
+    with tab2:
+        st.subheader("Program Distribution Treemap")
+        
+        def build_treemap():
+            # Create treemap data
+            treemap_data = filtered_df.copy()
+            treemap_data['Disease_Intervention'] = treemap_data['Disease'] + ' - ' + treemap_data['Intervention']
+
+            return px.treemap(
+                treemap_data,
+                path=['Disease', 'Program Name'],
+                values='Tot QALY Gain',
+                color='Cost per QALY',
+                color_continuous_scale='RdYlGn_r',
+                title="Program Distribution by Disease and Intervention"
+            )
+
+        fig = cached_figure((data_version, 'treemap', program_filter), build_treemap)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with tab3:
+        st.subheader("Multi-Dimensional Program Analysis")
+        
+        def build_bubbles():
+            fig = px.scatter(
+                filtered_df,
+                x='Patient',
+                y='Tot QALY Gain',
+                size='Survival Pop',
+                color='Avg QALY Gain',
+                hover_name='Program Name',
+                hover_data=['Disease', 'Cost'],
+                title="Program Size vs QALY Impact (bubble size = survival population)",
+                labels={
+                    'Patient': 'Total Patients',
+                    'Tot QALY Gain': 'Total QALY Gain',
+                    'Avg QALY Gain': 'Average QALY Gain'
+                }
+            )
+            fig.update_traces(marker=dict(line=dict(width=2, color='DarkSlateGrey')))
+            return fig
+
+        fig = cached_figure((data_version, 'bubbles', program_filter), build_bubbles)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with tab4:
+        st.subheader("Program Data Table")
+        
+        # Enhanced data table with calculations
+        display_df = filtered_df.copy()
+        display_df['Survival Rate'] = (display_df['Survival Pop'] / display_df['Patient'] * 100).round(1)
+        
+        with instrumentation.stage('dataframe', table='programs'):
+            st.dataframe(
+                display_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Cost": st.column_config.NumberColumn(
+                        "Cost ($)",
+                        format="$%d"
+                    ),
+                    "Survival Rate": st.column_config.NumberColumn(
+                        "Survival Rate (%)",
+                        format="%.1f%%"
+                    ),
+                    "Tot QALY Gain": st.column_config.NumberColumn(
+                        "Total QALY Gain",
+                        format="%d"
+                    )
+                }
+            )
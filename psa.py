@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Monte Carlo iterations drawn per program by default
+DEFAULT_ITERATIONS = 10_000
+
+# Coefficients of variation of the gamma-distributed QALY gain and cost
+DEFAULT_QALY_CV = 0.2
+DEFAULT_COST_CV = 0.2
+
+# Points on the willingness-to-pay axis of the acceptability curves
+WTP_STEPS = 101
+
+# Number of parameter sets whose results are kept in memory
+MAX_CACHED_RUNS = 16
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _gamma(rng, mean, cv, iterations):
+    """Gamma draws with the given mean and coefficient of variation, programs x iterations"""
+    mean = mean[:, None]
+    if cv <= 0:
+        return np.broadcast_to(mean, (len(mean), iterations)).astype('float64')
+    shape = 1 / cv ** 2
+    return rng.gamma(shape, mean * cv ** 2, size=(len(mean), iterations))
+
+
+def _survival(rng, patients, survivors, iterations):
+    """Beta draws of the surviving fraction, using each program's patient counts as the sample"""
+    deaths = patients - survivors
+    uncertain = (survivors > 0) & (deaths > 0)
+    base = np.divide(survivors, patients, out=np.ones_like(patients), where=patients > 0)
+    draws = np.broadcast_to(base[:, None], (len(patients), iterations)).copy()
+    draws[uncertain] = rng.beta(survivors[uncertain, None], deaths[uncertain, None],
+                                size=(int(uncertain.sum()), iterations))
+    return draws, base
+
+
+def sample_outcomes(qaly_df, iterations=DEFAULT_ITERATIONS, qaly_cv=DEFAULT_QALY_CV, cost_cv=DEFAULT_COST_CV, seed=0):
+    """QALY gain per patient and cost draws for every program in one batch, each programs x iterations
+
+    Survival uncertainty scales the QALY gain relative to the observed survival."""
+    rng = np.random.default_rng(seed)
+    patients = qaly_df['Patient'].to_numpy(dtype='float64')
+    survivors = qaly_df['Survival Pop'].to_numpy(dtype='float64')
+    survival, base = _survival(rng, patients, survivors, iterations)
+    ratio = np.divide(survival, base[:, None], out=np.ones_like(survival), where=base[:, None] > 0)
+    gain = _gamma(rng, qaly_df['Avg QALY Gain'].to_numpy(dtype='float64'), qaly_cv, iterations) * ratio
+    cost = _gamma(rng, qaly_df['Cost'].to_numpy(dtype='float64'), cost_cv, iterations)
+    return gain, cost
+
+
+def cost_per_qaly(gain, cost):
+    """Cost per QALY of every draw sorted per program; draws without a QALY gain sort last as inf"""
+    ratios = np.divide(cost, gain, out=np.full_like(cost, np.inf), where=gain > 0)
+    ratios.sort(axis=1)
+    return ratios
+
+
+def acceptability(ratios, wtp):
+    """Probability that each program is cost-effective at each willingness to pay, programs x len(wtp)
+
+    ratios are the sorted draws from cost_per_qaly(). A draw is cost-effective
+    when its net monetary benefit wtp x gain - cost is positive, i.e. when its
+    cost per QALY is below wtp."""
+    return np.stack([
+        np.searchsorted(row, wtp, side='left') for row in ratios
+    ]) / ratios.shape[1]
+
+
+def run_psa(qaly_df, iterations=DEFAULT_ITERATIONS, qaly_cv=DEFAULT_QALY_CV, cost_cv=DEFAULT_COST_CV, wtp_max=None, seed=0):
+    """Cost per QALY intervals and acceptability curves for every program
+
+    Returns (summary, ceac): one summary row per program with the mean and
+    95% interval of cost per QALY, and the acceptability curves in long
+    format with columns Program Name, Willingness to Pay and Probability."""
+    gain, cost = sample_outcomes(qaly_df, iterations, qaly_cv, cost_cv, seed)
+    ratios = cost_per_qaly(gain, cost)
+    # Percentiles read straight off the sorted draws
+    low, median, high = ratios[:, (np.array([0.025, 0.5, 0.975]) * (iterations - 1)).round().astype(int)].T
+    finite = np.isfinite(ratios)
+    summary = pd.DataFrame({
+        'Program ID': qaly_df['Program ID'].to_numpy(),
+        'Program Name': qaly_df['Program Name'].to_numpy(),
+        'Disease': qaly_df['Disease'].to_numpy(),
+        'Cost per QALY': qaly_df['Cost per QALY'].to_numpy(),
+        'Mean': np.where(finite, ratios, 0).sum(axis=1) / np.maximum(finite.sum(axis=1), 1),
+        'Median': median,
+        'CI Low': low,
+        'CI High': high,
+    })
+
+    if wtp_max is None:
+        wtp_max = float(high[np.isfinite(high)].max(initial=1.0))
+    wtp = np.linspace(0, wtp_max, WTP_STEPS)
+    curves = acceptability(ratios, wtp)
+    ceac = pd.DataFrame({
+        'Program Name': np.repeat(summary['Program Name'].to_numpy(), len(wtp)),
+        'Disease': np.repeat(summary['Disease'].to_numpy(), len(wtp)),
+        'Willingness to Pay': np.tile(wtp, len(summary)),
+        'Probability': curves.ravel(),
+    })
+    return summary, ceac
+
+
+def cached_psa(data_version, qaly_df, **params):
+    """run_psa() results for a data version and parameter set, computed once and kept in an LRU cache"""
+    key = (data_version, tuple(sorted(params.items())))
+    with _lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            return result
+    result = run_psa(qaly_df, **params)
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > MAX_CACHED_RUNS:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# Static assets; a dataset prefix ("RRT_") in front selects that dataset's own copy
+REFERENCES_FILE = "references.json"
+STYLE_FILE = "style.css"
+
+# Seconds between stat() checks of a cached asset
+STAT_INTERVAL = 2.0
+
+logger = logging.getLogger(__name__)
+
+# path -> (checked_at, (mtime_ns, size), value)
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_resource(path, parse):
+    """parse(text) of a UTF-8 file, re-read only when its mtime or size changes
+
+    Raises OSError when the file cannot be read, or whatever parse raises."""
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and now - cached[0] < STAT_INTERVAL:
+            return cached[2]
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if cached is not None and cached[1] == signature:
+        value = cached[2]
+    else:
+        with open(path, "r", encoding='utf-8-sig') as f:
+            value = parse(f.read())
+    with _lock:
+        _cache[path] = (now, signature, value)
+    return value
+
+
+def validate_references(references):
+    """Check a references file: a JSON object mapping titles to http(s) links"""
+    if not isinstance(references, dict):
+        raise ValueError("references must be a JSON object of title: link pairs")
+    for title, link in references.items():
+        if not title.strip():
+            raise ValueError("reference titles must not be empty")
+        if not isinstance(link, str) or not link.startswith(("http://", "https://")):
+            raise ValueError(f"reference {title!r} must link to an http(s) URL")
+    return references
+
+
+def _parse_references(text):
+    return validate_references(json.loads(text))
+
+
+def _dataset_file(dataset, filename):
+    """The dataset's own copy of an asset if it has one, otherwise the default"""
+    path = dataset + filename
+    return path if dataset and os.path.exists(path) else filename
+
+
+def references(dataset=""):
+    """Validated references of a dataset, falling back to the default references file"""
+    path = _dataset_file(dataset, REFERENCES_FILE)
+    try:
+        return load_resource(path, _parse_references)
+    except (OSError, ValueError) as e:
+        if path == REFERENCES_FILE:
+            logger.warning("Cannot load %s: %s", path, e)
+            return {}
+        logger.warning("Cannot load %s, using %s instead: %s", path, REFERENCES_FILE, e)
+        return references()
+
+
+def stylesheet(dataset=""):
+    """CSS for the app, the dataset's own stylesheet when it has one"""
+    try:
+        return load_resource(_dataset_file(dataset, STYLE_FILE), str)
+    except OSError as e:
+        logger.warning("Cannot load %s: %s", STYLE_FILE, e)
+        return ""
+
+
+def clear():
+    """Forget every cached asset"""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1 @@
+python serve.py --workers 4
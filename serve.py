@@ -0,0 +1,122 @@
+"""Run several Streamlit workers behind a local load balancer
+
+The loader step parses every dataset once into memory-mappable Arrow
+snapshots in a shared directory (tmpfs when available, where the file is
+the only copy). Each worker maps those snapshots instead of parsing the
+CSVs: the read-only ledger columns are zero-copy views of the mapped
+pages, held once per host. Each worker still keeps private copies of the
+columns transfers update (owner_id, transfer_count) and its own transfer
+indexes. Transfers and ingestion stay consistent across workers through
+the transfer log and file fingerprints.
+
+Clients are pinned to a worker by IP address, because a Streamlit session
+and the media it serves live in one worker. Every client behind the same
+proxy or NAT therefore lands on the same worker; in that setup put a
+proxy with cookie-based sticky sessions in front of the workers instead.
+
+    python serve.py --workers 4 --port 8501
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def shared_snapshot_dir():
+    """Directory for the Arrow snapshots shared by all workers on this host"""
+    if os.path.isdir("/dev/shm"):
+        return os.path.join("/dev/shm", "qaly_snapshots")
+    return os.path.join(tempfile.gettempdir(), "qaly_snapshots")
+
+
+def build_snapshots(snapshot_dir):
+    """Loader step: parse every dataset once and write its snapshots"""
+    os.environ["QALY_SNAPSHOT_DIR"] = snapshot_dir
+    import data_loader
+
+    datasets = data_loader.discover_datasets()
+    for prefix in datasets:
+        # The ledger is parsed lazily, so ask for it to have its snapshot written too
+        data_loader.load_dataset(prefix).nft_df
+    # The balancer process itself does not serve data
+    data_loader.invalidate()
+    return datasets
+
+
+def start_worker(port, snapshot_dir):
+    env = dict(os.environ, QALY_SNAPSHOT_DIR=snapshot_dir)
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.headless", "true"],
+        env=env,
+    )
+
+
+async def _pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def make_balancer(worker_ports):
+    async def handle(client_reader, client_writer):
+        # Pin each client address to one worker so its websocket session stays there;
+        # clients sharing a proxy or NAT address share a worker
+        host = client_writer.get_extra_info("peername")[0]
+        index = int(hashlib.md5(host.encode()).hexdigest(), 16) % len(worker_ports)
+        try:
+            worker_reader, worker_writer = await asyncio.open_connection("127.0.0.1", worker_ports[index])
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(_pipe(client_reader, worker_writer), _pipe(worker_reader, client_writer))
+
+    return handle
+
+
+async def supervise(workers, worker_ports, snapshot_dir):
+    # Restart workers that exit so the balancer always has a full pool
+    while True:
+        await asyncio.sleep(5)
+        for i, worker in enumerate(workers):
+            if worker.poll() is not None:
+                print(f"Worker on port {worker_ports[i]} exited, restarting")
+                workers[i] = start_worker(worker_ports[i], snapshot_dir)
+
+
+async def main(args):
+    snapshot_dir = args.snapshot_dir or shared_snapshot_dir()
+    datasets = build_snapshots(snapshot_dir)
+    print(f"Snapshots for {len(datasets)} dataset(s) in {snapshot_dir}")
+
+    worker_ports = [args.port + 1 + i for i in range(args.workers)]
+    workers = [start_worker(port, snapshot_dir) for port in worker_ports]
+    server = await asyncio.start_server(make_balancer(worker_ports), args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    try:
+        async with server:
+            await asyncio.gather(server.serve_forever(), supervise(workers, worker_ports, snapshot_dir))
+    finally:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the QALY dashboard from several worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--snapshot-dir", default=None, help="shared Arrow snapshot directory")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
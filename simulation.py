@@ -0,0 +1,121 @@
+"""Cohort Markov simulation of yearly QALY accrual for every program of a dataset
+
+Each program's patients start in the Treated state and move yearly between
+Treated, Lapsed and Dead. The yearly survival probability is derived from
+Patient and Survival Pop, and the yearly QALY gain per treated patient is
+calibrated so undiscounted QALYs over the horizon equal
+Patient x Avg QALY Gain. All programs are simulated at once as
+programs x years x states arrays.
+
+    python simulation.py --dataset RRT_ --years 10 --discount 0.035
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from locks import file_lock
+
+STATES = ['Treated', 'Lapsed', 'Dead']
+TREATED, LAPSED, DEAD = range(len(STATES))
+
+DEFAULT_YEARS = 10
+DEFAULT_START = "2020-01-01"
+
+TIME_SERIES_COLUMNS = [
+    'Program ID', 'Program Name', 'Disease', 'Intervention',
+    'Year', 'Date', 'Cumulative QALYs', 'Annual QALYs',
+]
+
+
+def transition_matrices(survival, dropout=0.0):
+    """Yearly transition matrices, programs x from-state x to-state"""
+    survival = np.asarray(survival, dtype='float64')
+    dropout = np.broadcast_to(np.asarray(dropout, dtype='float64'), survival.shape)
+    matrices = np.zeros((len(survival), len(STATES), len(STATES)))
+    matrices[:, TREATED, TREATED] = survival * (1 - dropout)
+    matrices[:, TREATED, LAPSED] = survival * dropout
+    matrices[:, TREATED, DEAD] = 1 - survival
+    matrices[:, LAPSED, LAPSED] = survival
+    matrices[:, LAPSED, DEAD] = 1 - survival
+    matrices[:, DEAD, DEAD] = 1
+    return matrices
+
+
+def cohort_trace(patients, matrices, years):
+    """Patients in each state at the start of every year and at the end, programs x (years + 1) x states"""
+    trace = np.zeros((len(patients), years + 1, len(STATES)))
+    trace[:, 0, TREATED] = patients
+    for year in range(years):
+        trace[:, year + 1] = np.einsum('ps,pst->pt', trace[:, year], matrices)
+    return trace
+
+
+def yearly_survival(patients, survivors, years):
+    """Constant yearly survival probability taking patients to survivors over the horizon"""
+    patients = np.asarray(patients, dtype='float64')
+    survivors = np.asarray(survivors, dtype='float64')
+    ratio = np.divide(survivors, patients, out=np.ones_like(patients), where=patients > 0)
+    return np.clip(ratio, 0, 1) ** (1 / years)
+
+
+def simulate(qaly_df, years=DEFAULT_YEARS, discount=0.0, dropout=0.0):
+    """Annual QALYs per program and year, programs x years
+
+    Annual QALYs are discounted at the middle of each year when discount > 0."""
+    patients = qaly_df['Patient'].to_numpy(dtype='float64')
+    survival = yearly_survival(patients, qaly_df['Survival Pop'].to_numpy(), years)
+    trace = cohort_trace(patients, transition_matrices(survival, dropout), years)
+
+    # Half-cycle correction: patients in a state for a year is the mean of its start and end counts
+    treated_years = (trace[:, :-1, TREATED] + trace[:, 1:, TREATED]) / 2
+    target = patients * qaly_df['Avg QALY Gain'].to_numpy(dtype='float64')
+    exposure = treated_years.sum(axis=1)
+    gain = np.divide(target, exposure, out=np.zeros_like(target), where=exposure > 0)
+
+    discount_factors = (1 + discount) ** -(np.arange(years) + 0.5)
+    return gain[:, None] * treated_years * discount_factors[None, :]
+
+
+def simulate_time_series(qaly_df, years=DEFAULT_YEARS, discount=0.0, dropout=0.0, start_date=DEFAULT_START):
+    """Time series table in the layout of time_series_data.csv, one row per program per year"""
+    annual = simulate(qaly_df, years, discount, dropout)
+    programs, horizon = annual.shape
+    year = np.tile(np.arange(1, horizon + 1), programs)
+    ts = pd.DataFrame({
+        column: np.repeat(qaly_df[column].to_numpy(), horizon)
+        for column in TIME_SERIES_COLUMNS[:4]
+    })
+    ts['Year'] = year
+    ts['Date'] = pd.Timestamp(start_date) + pd.to_timedelta(365 * (year - 1), unit='D')
+    ts['Cumulative QALYs'] = annual.cumsum(axis=1).ravel().round(2)
+    ts['Annual QALYs'] = annual.ravel().round(2)
+    return ts
+
+
+def refresh_time_series(dataset, years=DEFAULT_YEARS, discount=0.0, dropout=0.0, start_date=DEFAULT_START, path=None):
+    """Regenerate a dataset's time series file from its QALY_data.csv and return the table"""
+    qaly_df = data_loader.load_qaly_data(dataset + data_loader.TABLE_FILES['qaly_df'])
+    ts = simulate_time_series(qaly_df, years, discount, dropout, start_date)
+    path = path or dataset + data_loader.TABLE_FILES['time_series_df']
+    with file_lock(path):
+        tmp_path = path + ".tmp"
+        ts.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    data_loader.invalidate(dataset)
+    return ts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate a dataset's QALY time series by cohort simulation")
+    parser.add_argument("--dataset", default="", help="dataset prefix, e.g. RRT_")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--discount", type=float, default=0.0, help="yearly discount rate, e.g. 0.035")
+    parser.add_argument("--dropout", type=float, default=0.0, help="yearly probability of stopping treatment")
+    parser.add_argument("--start-date", default=DEFAULT_START)
+    parser.add_argument("--output", default=None, help="write here instead of the dataset's time series file")
+    args = parser.parse_args()
+    ts = refresh_time_series(args.dataset, args.years, args.discount, args.dropout, args.start_date, args.output)
+    print(f"Wrote {len(ts)} rows for {ts['Program ID'].nunique()} programs")
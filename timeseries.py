@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Zoom levels offered on the Time Series tab and their pandas period codes
+ZOOM_LEVELS = {'Year': 'Y', 'Quarter': 'Q', 'Month': 'M'}
+
+# Maximum points drawn across all series of one chart before downsampling
+POINT_BUDGET = 2000
+
+# Programs drawn individually; the rest are summed into OTHER_LABEL
+MAX_PROGRAMS = 12
+OTHER_LABEL = "Other"
+
+SERIES_KEYS = ['Program ID', 'Program Name', 'Disease', 'Intervention']
+
+
+def filter_dates(ts, date_range):
+    """Rows of the time series inside an inclusive (start, end) date range"""
+    if not date_range or len(date_range) != 2:
+        return ts
+    start = pd.Timestamp(date_range[0])
+    end = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    dates = ts['Date']
+    return ts[(dates >= start) & (dates < end)]
+
+
+def aggregate(ts, zoom):
+    """Roll the time series up to one row per program per period
+
+    Cumulative QALYs keep the last value of the period and Annual QALYs are
+    summed; Date becomes the start of the period."""
+    if ts.empty:
+        return ts
+    period = ts['Date'].dt.to_period(ZOOM_LEVELS[zoom])
+    rolled = ts.assign(Period=period).groupby(SERIES_KEYS + ['Period'], sort=True).agg(**{
+        'Year': ('Year', 'min'),
+        'Cumulative QALYs': ('Cumulative QALYs', 'last'),
+        'Annual QALYs': ('Annual QALYs', 'sum'),
+    }).reset_index()
+    rolled['Date'] = rolled['Period'].dt.start_time
+    return rolled.drop(columns='Period')
+
+
+def group_top_programs(ts, max_programs=MAX_PROGRAMS):
+    """Keep the programs with the most cumulative QALYs and sum the rest into one 'Other' series"""
+    totals = ts.groupby('Program Name')['Cumulative QALYs'].max()
+    if len(totals) <= max_programs:
+        return ts
+    top = totals.nlargest(max_programs - 1).index
+    kept = ts[ts['Program Name'].isin(top)]
+    other = ts[~ts['Program Name'].isin(top)].groupby('Date', sort=True).agg(**{
+        'Year': ('Year', 'min'),
+        'Cumulative QALYs': ('Cumulative QALYs', 'sum'),
+        'Annual QALYs': ('Annual QALYs', 'sum'),
+    }).reset_index()
+    other[SERIES_KEYS] = OTHER_LABEL
+    return pd.concat([kept, other[kept.columns]], ignore_index=True)
+
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    kept = np.empty(threshold, dtype='int64')
+    kept[0], kept[-1] = 0, n - 1
+    # Points between the fixed first and last ones are split into threshold - 2 buckets
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(ts, y_column, point_budget=POINT_BUDGET):
+    """Downsample every program's series so the chart stays within the point budget"""
+    series = ts.groupby('Program Name', sort=False)
+    threshold = max(3, point_budget // max(1, series.ngroups))
+    if len(ts) <= point_budget:
+        return ts
+    parts = []
+    for _, part in series:
+        part = part.sort_values('Date')
+        keep = lttb(part['Date'].to_numpy(dtype='datetime64[ns]').astype('int64'), part[y_column].to_numpy(), threshold)
+        parts.append(part.iloc[keep])
+    return pd.concat(parts, ignore_index=True)
+
+
+def prepare_chart_data(ts, date_range, zoom, y_column, max_programs=MAX_PROGRAMS, point_budget=POINT_BUDGET):
+    """Date filter, period roll-up, top-N grouping and downsampling for one time series chart"""
+    ts = filter_dates(ts, date_range)
+    ts = aggregate(ts, zoom)
+    if ts.empty:
+        return ts
+    ts = group_top_programs(ts, max_programs)
+    return downsample(ts, y_column, point_budget)
@@ -0,0 +1,198 @@
+import streamlit as st
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import numpy as np
+from datetime import date, timedelta
+
+from figure_cache import cached_figure
+from ledger import display_ledger, format_nft_id
+from transfers import TransferError
+
+def render():
+    data = st.session_state.dataset_handle.dataset
+    nft_df = data.nft_df
+    transfer_engine = data.engine
+
+    st.markdown("""
+    <div class='main-header'>
+        <h1>NFT Transfer Center</h1>
+        <p>Transfer NFTs between owners with full audit trail</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    tab1, tab2 = st.tabs(["Single Transfer", "Batch Transfer"])
+    
+    with tab1:
+        st.subheader("Single NFT Transfer")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Search all active NFTs by id prefix, one page of matches at a time
+            nft_query = st.text_input("Search NFT ID:", placeholder="e.g. NFT-0012 or 12", key="nft_query")
+            page_size = 50
+            _, match_count = transfer_engine.search('active', nft_query, limit=0)
+            page_count = max(1, -(-match_count // page_size))
+            nft_page = st.number_input(
+                f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1
+            ) if page_count > 1 else 1
+            available_nfts, _ = transfer_engine.search('active', nft_query, (nft_page - 1) * page_size, page_size)
+            st.caption(f"{match_count:,} matching active NFTs")
+
+            # Select NFT to transfer
+            selected_nft = st.selectbox("Select NFT to Transfer:", available_nfts, format_func=format_nft_id, key="selected_nft")
+            
+            if selected_nft is not None:
+                nft_details = transfer_engine.lookup(selected_nft)
+                
+                st.info(f"""
+                **NFT Details:**
+                - Program: {nft_details['program_id']}
+                - Disease: {nft_details['disease']}
+                - Intervention: {nft_details['intervention']}
+                - Current Owner: {nft_details['owner_id']}
+                - QALY Value: {nft_details['qaly_value']:.4f}
+                """)
+        
+        with col2:
+            # Transfer details
+            all_owners = sorted(nft_df['owner_id'].unique())
+            current_owner = nft_details['owner_id'] if 'nft_details' in locals() else None
+            available_recipients = [owner for owner in all_owners if owner != current_owner]
+            
+            new_owner = st.selectbox("Transfer to:", available_recipients if 'nft_details' in locals() else all_owners, key="new_owner")
+            transfer_reason = st.text_area("Transfer Reason (optional):", placeholder="e.g., Hospital merger, Research collaboration...")
+            
+            if st.button("Execute Transfer", type="primary"):
+                if selected_nft is not None and new_owner:
+                    try:
+                        record = transfer_engine.transfer(selected_nft, new_owner, transfer_reason)
+                    except TransferError as e:
+                        st.error(f"Transfer failed: {e}")
+                    else:
+                        st.success(f"Successfully transferred {format_nft_id(selected_nft)} from {record['from']} to {new_owner}")
+                        st.balloons()
+
+                        # Show transfer confirmation
+                        st.json({
+                            "transaction_id": record['transaction_id'],
+                            "nft_id": format_nft_id(selected_nft),
+                            "from": record['from'],
+                            "to": record['to'],
+                            "timestamp": record['timestamp'],
+                            "reason": record['reason'],
+                            "status": "completed"
+                        })
+    
+    with tab2:
+        st.subheader("Batch NFT Transfer")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Batch transfer parameters; only owners that still hold active NFTs can send
+            all_owners = sorted(nft_df['owner_id'].unique())
+            senders = sorted(owner for owner, held in transfer_engine.owner_active.items() if held)
+            from_owner = st.selectbox("Transfer from:", senders)
+            to_owner = st.selectbox("Transfer to:", [owner for owner in all_owners if owner != from_owner])
+            
+            # Show available NFTs for selected owner
+            owner_nfts = nft_df.iloc[np.sort(transfer_engine.positions.get_indexer(list(transfer_engine.active_nfts(from_owner))))]
+            st.write(f"Available NFTs from {from_owner}: {len(owner_nfts)}")
+            
+            transfer_count = st.number_input(
+                "Number of NFTs to transfer:",
+                min_value=1,
+                max_value=len(owner_nfts),
+                value=min(5, len(owner_nfts))
+            ) if len(owner_nfts) > 0 else 0
+            
+        with col2:
+            # Preview of NFTs to be transferred (oldest first)
+            if from_owner and len(owner_nfts) > 0:
+                nfts_to_transfer = owner_nfts.nsmallest(transfer_count, 'mint_date')
+                
+                st.subheader("NFTs to be transferred:")
+                st.dataframe(
+                    display_ledger(nfts_to_transfer, ['nft_id', 'program_id', 'disease', 'mint_date', 'qaly_value']),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                
+                total_qaly_value = nfts_to_transfer['qaly_value'].sum()
+                st.metric("Total QALY Value", f"{total_qaly_value:.4f}")
+            else:
+                st.info("No owner holds active NFTs to transfer.")
+        
+        # Batch transfer execution
+        st.markdown("---")
+        batch_reason = st.text_area("Batch Transfer Reason:", placeholder="e.g., Department restructuring, Grant requirements...")
+        
+        if st.button("Execute Batch Transfer", type="primary", disabled=transfer_count == 0):
+            if from_owner and to_owner and transfer_count > 0:
+                try:
+                    with st.spinner(f"Transferring {transfer_count} NFTs..."):
+                        record = transfer_engine.batch_transfer(nfts_to_transfer['nft_id'], to_owner, batch_reason)
+                except TransferError as e:
+                    st.error(f"Batch transfer failed: {e}")
+                else:
+                    st.success(f"Successfully transferred {transfer_count} NFTs from {from_owner} to {to_owner}")
+                    st.balloons()
+
+                    # Show batch transfer summary
+                    batch_summary = {
+                        "batch_id": record['transaction_id'],
+                        "nfts_transferred": len(record['nft_ids']),
+                        "from_owner": record['from'],
+                        "to_owner": record['to'],
+                        "total_qaly_value": f"{record['qaly_value']:.4f}",
+                        "timestamp": record['timestamp'],
+                        "reason": record['reason'],
+                        "status": "completed"
+                    }
+
+                    st.json(batch_summary)
+        
+        # Transfer history visualization
+        st.markdown("---")
+        st.subheader("Transfer Activity Visualization")
+
+        # Daily rollups of the audit log, served from precomputed buckets
+        history = data.history
+        window_days = st.selectbox("Window:", [7, 30, 90, 365], index=1, format_func=lambda days: f"Last {days} days")
+        end = date.today()
+        start = end - timedelta(days=window_days - 1)
+        ledger_version = f"{st.session_state.data_version}:{transfer_engine.sequence}"
+
+        def build_history():
+            transfer_df = history.window(start, end)
+            fig = make_subplots(
+                rows=2, cols=1,
+                subplot_titles=('Daily Transfer Count', 'Daily Transfer Volume (QALYs)'),
+                vertical_spacing=0.1
+            )
+
+            fig.add_trace(
+                go.Scatter(x=transfer_df['date'], y=transfer_df['transfers'],
+                          mode='lines+markers', name='Transfers', line=dict(color='#667eea')),
+                row=1, col=1
+            )
+
+            fig.add_trace(
+                go.Scatter(x=transfer_df['date'], y=transfer_df['volume'],
+                          mode='lines+markers', name='Volume', line=dict(color='#764ba2')),
+                row=2, col=1
+            )
+
+            fig.update_layout(height=400, showlegend=False, title_text="Recent Transfer Activity")
+            return fig
+
+        fig = cached_figure((ledger_version, 'transfer_history', end, window_days), build_history)
+        st.plotly_chart(fig, use_container_width=True)
+
+        totals = history.totals()
+        st.caption(
+            f"{totals['transfers']:,} NFTs moved in {totals['transactions']:,} logged transactions"
+            + (f" since {history.first_day():%d/%m/%Y}" if history.first_day() else "")
+            + f"; {totals['undated']:,} earlier transfers recorded in the ledger have no date."
+        )
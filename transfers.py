@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ledger import format_nft_id, id_prefix_ranges, parse_nft_ids
+from locks import file_lock
+
+# Write-ahead audit log of every transfer, one JSON object per line, per dataset prefix
+TRANSFER_LOG = "transfer_log.jsonl"
+
+
+class TransferError(ValueError):
+    """Raised when a transfer request does not match the current ledger"""
+
+
+class TransferEngine:
+    """Applies NFT transfers to a dataset's ledger and records them in the audit log
+
+    The ledger DataFrame is updated in place, so every session holding it sees
+    the new owners. Transferred NFTs stay active so the new owner can move
+    them on."""
+
+    def __init__(self, prefix, nft_df):
+        self.prefix = prefix
+        self.nft_df = nft_df
+        self.log_path = prefix + TRANSFER_LOG
+        self.log_offset = 0
+        self.sequence = 0
+        # Called as listener(rows, previous_owners) after each applied transaction
+        self.listeners = []
+        # Called as listener(record) with the audit log record of each applied transaction
+        self.record_listeners = []
+        self._lock = threading.RLock()
+        self._build_index()
+        self.catch_up()
+
+    def _build_index(self):
+        # nft_id -> row position, hash-based so single lookups are O(1)
+        self.positions = pd.Index(self.nft_df['nft_id'].to_numpy())
+        # owner_id -> set of active nft_ids
+        active = self.nft_df[self.nft_df['status'] == 'active']
+        self.owner_active = {
+            owner: set(ids.tolist())
+            for owner, ids in active.groupby('owner_id', observed=True)['nft_id']
+        }
+        # status -> sorted nft_ids, for paged and prefix search
+        self.status_ids = {
+            status: np.sort(ids.to_numpy())
+            for status, ids in self.nft_df.groupby('status', observed=True)['nft_id']
+        }
+
+    def lookup(self, nft_id):
+        """Ledger row of one NFT"""
+        return self.nft_df.iloc[self.positions.get_loc(nft_id)]
+
+    def search(self, status, query="", offset=0, limit=50):
+        """Page of nft_ids with the given status whose id starts with query, and the match count"""
+        ids = self.status_ids.get(status, np.empty(0, dtype='int64'))
+        if query.strip():
+            ranges = id_prefix_ranges(query, int(ids[-1]) if len(ids) else 0)
+            if ranges is None:
+                return [], 0
+            # Matching ids are contiguous runs of the sorted array
+            ids = np.concatenate([
+                ids[np.searchsorted(ids, low):np.searchsorted(ids, high)] for low, high in ranges
+            ])
+        return ids[offset:offset + limit].tolist(), len(ids)
+
+    def owner_of(self, nft_id):
+        return self.nft_df['owner_id'].iat[self.positions.get_loc(nft_id)]
+
+    def active_nfts(self, owner):
+        return self.owner_active.get(owner, set())
+
+    def transfer(self, nft_id, to_owner, reason=""):
+        """Transfer one NFT and return the transaction record"""
+        return self._commit("TXN", [nft_id], to_owner, reason)
+
+    def batch_transfer(self, nft_ids, to_owner, reason=""):
+        """Transfer several NFTs in one atomic transaction and return its record"""
+        return self._commit("BATCH", list(nft_ids), to_owner, reason)
+
+    def catch_up(self):
+        """Apply transactions appended to the log since it was last read, e.g. by another worker"""
+        with self._lock:
+            if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) <= self.log_offset:
+                return 0
+            with open(self.log_path, "rb") as f:
+                f.seek(self.log_offset)
+                chunk = f.read()
+            # Ignore a trailing partial line; it is picked up once fully written
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            applied = 0
+            for line in complete.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    self._apply(parse_nft_ids(record['nft_ids']).to_numpy(), record['to'])
+                    self._notify(record)
+                    applied += 1
+            self.log_offset += len(complete)
+            return applied
+
+    def _commit(self, kind, nft_ids, to_owner, reason):
+        with self._lock, file_lock(self.log_path):
+            self.catch_up()
+            nft_ids = np.asarray(nft_ids, dtype='int64')
+            from_owner = self._validate(nft_ids, to_owner)
+            record = {
+                "transaction_id": f"{kind}-{uuid.uuid4().hex[:8].upper()}",
+                "nft_ids": [format_nft_id(nft_id) for nft_id in nft_ids],
+                "from": from_owner,
+                "to": to_owner,
+                "qaly_value": round(float(self.nft_df['qaly_value'].to_numpy()[
+                    self.positions.get_indexer(nft_ids)].sum(dtype='float64')), 4),
+                "timestamp": datetime.now().isoformat(),
+                "reason": reason or "Not specified",
+            }
+            line = (json.dumps(record) + "\n").encode('utf-8')
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_offset += len(line)
+            self._apply(nft_ids, to_owner)
+            self._notify(record)
+            return record
+
+    def _notify(self, record):
+        for listener in self.record_listeners:
+            listener(record)
+
+    def _validate(self, nft_ids, to_owner):
+        if len(nft_ids) == 0:
+            raise TransferError("No NFTs selected for transfer")
+        if len(np.unique(nft_ids)) != len(nft_ids):
+            raise TransferError("An NFT appears more than once in the transfer")
+        rows = self.positions.get_indexer(nft_ids)
+        if (rows < 0).any():
+            missing = nft_ids[rows < 0][0]
+            raise TransferError(f"{format_nft_id(missing)} is not in the ledger")
+        owners = self.nft_df['owner_id'].to_numpy()[rows]
+        from_owner = owners[0]
+        if (owners != from_owner).any():
+            raise TransferError("All NFTs in a batch must belong to the same owner")
+        if from_owner == to_owner:
+            raise TransferError(f"NFTs are already owned by {to_owner}")
+        inactive = [nft_id for nft_id in nft_ids.tolist() if nft_id not in self.active_nfts(from_owner)]
+        if inactive:
+            raise TransferError(f"{format_nft_id(inactive[0])} is not active")
+        return str(from_owner)
+
+    def _apply(self, nft_ids, to_owner):
+        rows = self.positions.get_indexer(nft_ids)
+        nft_ids, rows = nft_ids[rows >= 0], rows[rows >= 0]
+        if len(rows) == 0:
+            return
+        df = self.nft_df
+        if to_owner not in df['owner_id'].cat.categories:
+            df['owner_id'] = df['owner_id'].cat.add_categories([to_owner])
+        previous = df['owner_id'].iloc[rows].to_numpy()
+        counts = df['transfer_count'].to_numpy()[rows] + 1
+
+        df.iloc[rows, df.columns.get_loc('owner_id')] = to_owner
+        df.iloc[rows, df.columns.get_loc('transfer_count')] = counts.astype(df['transfer_count'].dtype)
+
+        for nft_id, owner in zip(nft_ids.tolist(), previous):
+            held = self.owner_active.get(owner)
+            if held is not None and nft_id in held:
+                held.discard(nft_id)
+                self.owner_active.setdefault(to_owner, set()).add(nft_id)
+        self.sequence += 1
+        for listener in self.listeners:
+            listener(rows, previous)